@@ -1,78 +1,213 @@
+import asyncio
+from typing import Any, AsyncGenerator, Dict, Optional, Set
+
 import bentoml
+import orjson
+from starlette.responses import Response
+
 from src.config import settings
+from src.core.batcher import RequestBatcher
 from src.core.model_manager import ModelManager
 from src.models.enums import TaskType
-from src.utils.gpu_utils import initialize_gpu
+from src.utils.encoding import RAW_OUTPUT
+from src.utils.exceptions import VRAMExhaustedError
+from src.utils.gpu_utils import get_vram_usage_gb, initialize_gpu
 from src.utils.logger import logger
 from src.schemas import (
     ExecuteRequest, ExecuteResponse,
-    ModelStatusResponse, ModelStatusItem,
+    ExecuteRequestImage, ExecuteRequestSTT, ExecuteRequestText, ExecuteRequestTTS,
+    ModelStatusResponse,
     FetchRequest, FetchResponse, PurgeResponse,
 )
 
 
+def _json_response(content: Dict[str, Any]) -> Response:
+    # orjson emits bytes directly; BentoML's default path builds a str via
+    # model_dump_json() and then copies it again with .encode(). Responses
+    # are plain dicts shaped like their schema, so no model round trip.
+    return Response(orjson.dumps(content), media_type="application/json")
+
+
+def _wants_raw(ctx: Optional[bentoml.Context]) -> bool:
+    return ctx is not None and "application/octet-stream" in ctx.request.headers.get("accept", "")
+
+
+def _binary_response(task_type: TaskType, result: Dict[str, Any]) -> Response:
+    kind = "image" if task_type == TaskType.IMAGE else "audio"
+    headers = {}
+    if "sample_rate" in result:
+        headers["X-Sample-Rate"] = str(result["sample_rate"])
+    return Response(result["data"], media_type=f"{kind}/{result['format']}", headers=headers)
+
+
+def _sse(data: Any, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {orjson.dumps(data).decode()}\n\n"
+
+
 @bentoml.service(
     name="damo",
     resources={"gpu": 1},
-    traffic={"timeout": 300},
+    traffic={"timeout": 300, "max_concurrency": settings.max_concurrency},
 )
 class DAMOService:
     def __init__(self):
         device = initialize_gpu()
         settings.device = device
         self.model_manager = ModelManager()
-        logger.info(f"DAMO BentoML service initialized on device={device}")
+        self.vram_manager = self.model_manager.vram_manager
+        # Everything but the usage figure is fixed after startup
+        self._health_prefix = orjson.dumps({"status": "ok", "device": settings.device})[:-1]
+        self.batcher = RequestBatcher(self.model_manager.infer_batch)
+        # Strong references to fire-and-forget tasks so they aren't collected
+        self._background: Set[asyncio.Task] = set()
+        logger.info("DAMO BentoML service initialized on device=%s", device)
 
-    def _execute(self, task_type: TaskType, request: ExecuteRequest) -> ExecuteResponse:
-        result = self.model_manager.infer(
-            model_id=request.model_id, task_type=task_type,
-            input_data=request.input, params=request.params,
-            force_reload=request.force_reload,
-        )
-        return ExecuteResponse(
-            model_id=request.model_id, task_type=task_type.value,
-            result=result,
-            vram_usage_percent=self.model_manager.vram_manager.get_vram_usage_percent(),
-        )
+    async def _execute(
+        self, task_type: TaskType, request: ExecuteRequest,
+        ctx: Optional[bentoml.Context] = None,
+    ) -> ExecuteResponse:
+        raw = _wants_raw(ctx)
+        # Always set the flag so clients can't smuggle raw bytes into JSON
+        params = {**request.params.model_dump(exclude_unset=True), RAW_OUTPUT: raw}
+        vram_manager = self.vram_manager
+        vram_manager.mark_pending(request.model_id)
+        try:
+            submit = lambda: self.batcher.submit(
+                model_id=request.model_id, task_type=task_type,
+                input_data=request.input, params=params,
+                force_reload=request.force_reload,
+            )
+            try:
+                result = await submit()
+            except VRAMExhaustedError as e:
+                # Free headroom for this load and the next few, then retry once
+                evicted = await asyncio.to_thread(self.model_manager.reclaim, e.required_gb * 3)
+                if not evicted:
+                    raise
+                result = await submit()
+        finally:
+            vram_manager.mark_done(request.model_id)
+        if raw:
+            return _binary_response(task_type, result)
+        # Same shape as ExecuteResponse, encoded straight from a dict so the
+        # (often multi-MB) result never passes through a pydantic model
+        return _json_response({
+            "model_id": request.model_id, "task_type": task_type.value,
+            "result": result,
+            "vram_usage_percent": self.vram_manager.get_vram_usage_percent(),
+        })
+
+    async def _stream(self, task_type: TaskType, request: ExecuteRequest) -> AsyncGenerator[str, None]:
+        vram_manager = self.vram_manager
+        vram_manager.mark_pending(request.model_id)
+        try:
+            # Held for the whole stream so it never overlaps a batch on the same model
+            async with self.batcher.model_lock(request.model_id):
+                # Loads on the first next() and holds the model's lock until closed
+                chunks = self.model_manager.stream(
+                    request.model_id, task_type,
+                    request.input, request.params.model_dump(exclude_unset=True),
+                    request.force_reload,
+                )
+                done = object()
+                step = None
+                try:
+                    while True:
+                        # Shielded so a client disconnect can't abandon a
+                        # next() that is still running in its thread
+                        step = asyncio.ensure_future(asyncio.to_thread(next, chunks, done))
+                        chunk = await asyncio.shield(step)
+                        if chunk is done:
+                            break
+                        yield _sse(chunk)
+                except Exception as e:
+                    logger.error("Stream for %s failed: %s", request.model_id, e)
+                    yield _sse({"error": str(e)}, event="error")
+                    return
+                finally:
+                    if step is not None and not step.done():
+                        await asyncio.wait([step])
+                    # Releases the model (and stops generation) if the client left early
+                    await asyncio.to_thread(chunks.close)
+            yield "data: [DONE]\n\n"
+        finally:
+            vram_manager.mark_done(request.model_id)
 
     @bentoml.api(route="/v1/execute/text")
-    def execute_text(self, request: ExecuteRequest) -> ExecuteResponse:
-        return self._execute(TaskType.TEXT, request)
+    async def execute_text(self, request: ExecuteRequestText) -> ExecuteResponse:
+        return await self._execute(TaskType.TEXT, request)
+
+    @bentoml.api(route="/v1/execute/text/stream")
+    async def execute_text_stream(self, request: ExecuteRequestText) -> AsyncGenerator[str, None]:
+        async for event in self._stream(TaskType.TEXT, request):
+            yield event
 
     @bentoml.api(route="/v1/execute/audio_tts")
-    def execute_tts(self, request: ExecuteRequest) -> ExecuteResponse:
-        return self._execute(TaskType.AUDIO_TTS, request)
+    async def execute_tts(self, request: ExecuteRequestTTS, ctx: bentoml.Context) -> ExecuteResponse:
+        return await self._execute(TaskType.AUDIO_TTS, request, ctx)
 
     @bentoml.api(route="/v1/execute/audio_stt")
-    def execute_stt(self, request: ExecuteRequest) -> ExecuteResponse:
-        return self._execute(TaskType.AUDIO_STT, request)
+    async def execute_stt(self, request: ExecuteRequestSTT) -> ExecuteResponse:
+        return await self._execute(TaskType.AUDIO_STT, request)
+
+    @bentoml.api(route="/v1/execute/audio_stt/raw")
+    async def execute_stt_raw(
+        self, model_id: str, audio: bytes,
+        params: Optional[Dict[str, Any]] = None, force_reload: bool = False,
+    ) -> ExecuteResponse:
+        request = ExecuteRequestSTT(
+            model_id=model_id, input=audio, params=params or {}, force_reload=force_reload,
+        )
+        return await self._execute(TaskType.AUDIO_STT, request)
 
     @bentoml.api(route="/v1/execute/image")
-    def execute_image(self, request: ExecuteRequest) -> ExecuteResponse:
-        return self._execute(TaskType.IMAGE, request)
+    async def execute_image(self, request: ExecuteRequestImage, ctx: bentoml.Context) -> ExecuteResponse:
+        return await self._execute(TaskType.IMAGE, request, ctx)
 
     @bentoml.api(route="/v1/models/status")
-    def models_status(self) -> ModelStatusResponse:
-        statuses = self.model_manager.get_all_model_status()
-        items = [ModelStatusItem(**s) for s in statuses]
-        return ModelStatusResponse(
-            models=items,
-            vram_usage_percent=self.model_manager.vram_manager.get_vram_usage_percent(),
-            active_downloads=list(self.model_manager.download_manager.active_downloads),
-        )
+    async def models_status(self) -> ModelStatusResponse:
+        statuses = await asyncio.to_thread(self.model_manager.get_all_model_status)
+        # Statuses are built by ModelManager and already match the schema;
+        # orjson encodes the active_downloads tuple as a JSON array
+        return _json_response({
+            "models": statuses,
+            "vram_usage_percent": self.vram_manager.get_vram_usage_percent(),
+            "active_downloads": self.model_manager.download_manager.active_downloads,
+        })
 
     @bentoml.api(route="/v1/models/purge")
-    def purge_models(self) -> PurgeResponse:
-        self.model_manager.purge_all()
-        return PurgeResponse(message="All models purged from VRAM")
+    async def purge_models(self, target_free_gb: Optional[float] = None) -> PurgeResponse:
+        before_gb = get_vram_usage_gb()
+        evicted = await asyncio.to_thread(self.model_manager.reclaim, target_free_gb)
+        freed_mb = max(0.0, before_gb - get_vram_usage_gb()) * 1024
+        if target_free_gb is None:
+            message = "All models purged from VRAM"
+        else:
+            message = f"Reclaimed VRAM until {target_free_gb:.1f}GB is free"
+        return _json_response({"message": message, "freed_mb": freed_mb, "evicted": evicted})
 
     @bentoml.api(route="/v1/models/fetch")
-    def fetch_model(self, request: FetchRequest) -> FetchResponse:
-        path = self.model_manager.fetch_model(request.model_id)
-        return FetchResponse(model_id=request.model_id, path=path,
-                             message=f"Model {request.model_id} is available on disk")
+    async def fetch_model(self, request: FetchRequest) -> FetchResponse:
+        path = await asyncio.to_thread(self.model_manager.fetch_model, request.model_id)
+        message = f"Model {request.model_id} is available on disk"
+        if request.task_type is not None:
+            task = asyncio.create_task(self._warm(request.model_id, request.task_type))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            message += ", loading into VRAM in the background"
+        return _json_response({"model_id": request.model_id, "path": path, "message": message})
+
+    async def _warm(self, model_id: str, task_type: TaskType):
+        try:
+            await asyncio.to_thread(self.model_manager.load_model, model_id, task_type)
+        except Exception as e:
+            logger.warning("Background load of %s failed: %s", model_id, e)
 
     @bentoml.api(route="/health")
-    def health(self) -> dict:
-        return {"status": "ok", "device": settings.device,
-                "vram_usage_percent": self.model_manager.vram_manager.get_vram_usage_percent()}
+    async def health(self) -> dict:
+        usage = orjson.dumps(self.vram_manager.get_vram_usage_percent())
+        return Response(
+            self._health_prefix + b',"vram_usage_percent":' + usage + b"}",
+            media_type="application/json",
+        )
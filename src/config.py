@@ -10,6 +10,17 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
     host: str = "0.0.0.0"
     port: int = 8000
+    max_batch_size: int = 8
+    max_latency_ms: float = 10.0
+    eviction_lookahead: int = 8
+    offload_to_host: bool = False
+    llm_cuda_graphs: bool = False
+    torch_compile: bool = False
+    llm_backend: str = "transformers"
+    vllm_gpu_memory_utilization: float = 0.5
+    quantization: str = "none"
+    max_concurrency: int = 512
+    download_workers: int = 8
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from src.config import settings
+from src.models.enums import TaskType
+from src.utils.logger import logger
+
+BatchKey = Tuple[TaskType, str]
+
+# A worker with nothing queued for this long exits; the next request for
+# its model starts a new one
+WORKER_IDLE_S = 60.0
+
+
+@dataclass
+class PendingRequest:
+    input_data: Any
+    params: Dict[str, Any]
+    force_reload: bool
+    future: asyncio.Future
+
+
+class RequestBatcher:
+    def __init__(
+        self,
+        infer_batch: Callable[..., List[Any]],
+        max_batch_size: Optional[int] = None,
+        max_latency_ms: Optional[float] = None,
+        idle_timeout_s: float = WORKER_IDLE_S,
+    ):
+        self._infer_batch = infer_batch
+        self._max_batch_size = max(1, max_batch_size or settings.max_batch_size)
+        if max_latency_ms is None:
+            max_latency_ms = settings.max_latency_ms
+        self._max_latency = max(0.0, max_latency_ms) / 1000
+        self._idle_timeout = idle_timeout_s
+        self._queues: Dict[BatchKey, asyncio.Queue] = {}
+        self._workers: Dict[BatchKey, asyncio.Task] = {}
+        # Batches for the same model never overlap, even across task types.
+        # A lock only exists while someone holds or waits on it, so model IDs
+        # from failed or one-off requests don't accumulate.
+        self._model_locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+
+    async def submit(
+        self,
+        model_id: str,
+        task_type: TaskType,
+        input_data: Any,
+        params: Dict[str, Any],
+        force_reload: bool = False,
+    ) -> Any:
+        key = (task_type, model_id)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            self._workers[key] = asyncio.create_task(self._worker(key, queue))
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait(PendingRequest(input_data, params, force_reload, future))
+        return await future
+
+    @asynccontextmanager
+    async def model_lock(self, model_id: str) -> AsyncIterator[None]:
+        lock = self._model_locks.get(model_id)
+        if lock is None:
+            lock = self._model_locks[model_id] = asyncio.Lock()
+        self._lock_users[model_id] = self._lock_users.get(model_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[model_id] -= 1
+            if not self._lock_users[model_id]:
+                del self._lock_users[model_id]
+                del self._model_locks[model_id]
+
+    async def _collect(self, queue: asyncio.Queue) -> List[PendingRequest]:
+        try:
+            batch = [await asyncio.wait_for(queue.get(), self._idle_timeout)]
+        except asyncio.TimeoutError:
+            return []
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_latency
+        while len(batch) < self._max_batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, key: BatchKey, batch: List[PendingRequest]) -> List[Any]:
+        task_type, model_id = key
+        async with self.model_lock(model_id):
+            force_reload = any(r.force_reload for r in batch)
+            # One reload serves the whole batch; a per-request retry after a
+            # failure reuses the fresh weights instead of reloading again
+            for request in batch:
+                request.force_reload = False
+            return await asyncio.to_thread(
+                self._infer_batch,
+                model_id,
+                task_type,
+                [r.input_data for r in batch],
+                [r.params for r in batch],
+                force_reload,
+            )
+
+    async def _worker(self, key: BatchKey, queue: asyncio.Queue):
+        while True:
+            collected = await self._collect(queue)
+            if not collected:
+                # submit() finds the queue and enqueues without awaiting, so
+                # nothing can arrive between this check and the removal
+                if queue.empty():
+                    del self._queues[key]
+                    del self._workers[key]
+                    return
+                continue
+            batch = [r for r in collected if not r.future.done()]
+            if not batch:
+                continue
+            try:
+                results = await self._run(key, batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._resolve(batch[0], error=e)
+                    continue
+                # Retry one by one so a single bad input doesn't fail its peers
+                logger.warning(
+                    "Batch of %s for %s failed (%s), retrying individually",
+                    len(batch), key[1], e,
+                )
+                for request in batch:
+                    try:
+                        result = (await self._run(key, [request]))[0]
+                    except Exception as item_error:
+                        self._resolve(request, error=item_error)
+                    else:
+                        self._resolve(request, result=result)
+                continue
+            for request, result in zip(batch, results):
+                self._resolve(request, result=result)
+
+    @staticmethod
+    def _resolve(request: PendingRequest, result: Any = None, error: Optional[Exception] = None):
+        if request.future.done():
+            return
+        if error is not None:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(result)
@@ -1,87 +1,189 @@
 from __future__ import annotations
 
 import os
-import time
-from concurrent.futures import ThreadPoolExecutor
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from importlib.util import find_spec
+from typing import Dict, List, Optional, Tuple
 
-from huggingface_hub import snapshot_download
+# huggingface_hub reads these at import time, so set them before importing it.
+# hf_transfer (hub < 1.0) and hf_xet (hub >= 1.0) fetch files in parallel chunks.
+if find_spec("hf_transfer") is not None:
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+os.environ.setdefault("HF_XET_HIGH_PERFORMANCE", "1")
+# Without either backend snapshot_download fetches each file over one connection
+ACCELERATED_BACKEND = find_spec("hf_transfer") is not None or find_spec("hf_xet") is not None
+
+from huggingface_hub import HfApi, snapshot_download
 
 from src.config import settings
+from src.core.ranged_download import download_repo, redundant_weight_files
 from src.models.enums import ModelState
 from src.utils.exceptions import DownloadError
 from src.utils.logger import logger
 
+# Weights for other frameworks; every engine here loads PyTorch checkpoints
+IGNORE_PATTERNS = ["*.msgpack", "*.h5", "*.onnx", "*.onnx_data", "*.tflite", "*.ot", "*.mlmodel"]
+WEIGHT_SUFFIXES = (".safetensors", ".bin", ".pt", ".pth")
+# Left behind by an interrupted download (ranged_download or huggingface_hub)
+PARTIAL_SUFFIXES = (".partial", ".incomplete")
+
 
 class DownloadManager:
     def __init__(self):
         self._cache_dir = Path(settings.model_cache_dir)
         self._cache_dir.mkdir(parents=True, exist_ok=True)
-        self._executor = ThreadPoolExecutor(max_workers=2)
-        self._active_downloads: Set[str] = set()
+        # Set when the download finishes, waking every caller waiting on it
+        self._active_downloads: Dict[str, threading.Event] = {}
+        # Immutable copy for status readers; rebuilt whenever the dict changes
+        self._active_snapshot: Tuple[str, ...] = ()
+        self._downloads_lock = threading.Lock()
+        # model_id -> local path of every completely downloaded model dir,
+        # so lookups and warm requests don't rescan the filesystem
+        self._cache_index: Dict[str, str] = self._scan_cache_dir()
 
     def _model_disk_path(self, model_id: str) -> Path:
         safe_name = model_id.replace("/", "--")
         return self._cache_dir / safe_name
 
+    def _scan_cache_dir(self) -> Dict[str, str]:
+        index = {}
+        # scandir yields the entry type with each name, so no per-entry stat
+        with os.scandir(self._cache_dir) as entries:
+            for entry in entries:
+                if entry.is_dir() and self._is_complete(entry.path):
+                    index[entry.name.replace("--", "/")] = entry.path
+        return index
+
+    @staticmethod
+    def _is_complete(path: str) -> bool:
+        # Has files, and none half-written; an interrupted download is
+        # resumed by the next download() instead of being handed to an engine
+        has_files = False
+        for _, _, files in os.walk(path):
+            if any(f.endswith(PARTIAL_SUFFIXES) for f in files):
+                return False
+            has_files = has_files or bool(files)
+        return has_files
+
     def is_cached(self, model_id: str) -> bool:
-        path = self._model_disk_path(model_id)
-        return path.exists() and any(path.iterdir())
+        return self.get_disk_path(model_id) is not None
 
     def get_disk_path(self, model_id: str) -> Optional[str]:
-        path = self._model_disk_path(model_id)
-        if path.exists() and any(path.iterdir()):
-            return str(path)
+        path = self._cache_index.get(model_id)
+        if path is not None:
+            if os.path.isdir(path):
+                return path
+            # Deleted from disk since it was indexed
+            self._cache_index.pop(model_id, None)
+        if model_id in self._active_downloads:
+            return None
+        # Picks up models placed in the cache dir after startup
+        path = str(self._model_disk_path(model_id))
+        if os.path.isdir(path) and self._is_complete(path):
+            self._cache_index[model_id] = path
+            return path
         return None
 
     def _download_sync(self, model_id: str) -> str:
         token = settings.hf_token or None
         local_dir = self._model_disk_path(model_id)
         try:
+            if not ACCELERATED_BACKEND:
+                return download_repo(
+                    model_id, local_dir, token, IGNORE_PATTERNS, settings.download_workers
+                )
+            # Exact names, since fnmatch's * would also match across folders
+            duplicates = redundant_weight_files(HfApi(token=token).list_repo_files(model_id))
             snapshot_download(
                 repo_id=model_id,
                 local_dir=str(local_dir),
                 token=token,
+                max_workers=settings.download_workers,
+                etag_timeout=30,
+                ignore_patterns=IGNORE_PATTERNS + duplicates,
             )
             return str(local_dir)
         except Exception as e:
             raise DownloadError(model_id, str(e))
 
     def download(self, model_id: str) -> str:
+        path = self._cache_index.get(model_id)
+        if path is not None:
+            if os.path.isdir(path):
+                return path
+            self._cache_index.pop(model_id, None)
+        path = self._resolve(model_id)
+        self._cache_index[model_id] = path
+        return path
+
+    def readahead(self, disk_path: str):
+        # Starts kernel readahead of the weight files so the engine's load
+        # finds them in the page cache instead of faulting them in from disk
+        if not hasattr(os, "posix_fadvise"):
+            return
+        for path in Path(disk_path).rglob("*"):
+            if path.suffix not in WEIGHT_SUFFIXES:
+                continue
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+
+    def invalidate(self, model_id: str):
+        self._cache_index.pop(model_id, None)
+
+    def _resolve(self, model_id: str) -> str:
         if self.is_cached(model_id):
-            logger.info(f"Model {model_id} found in disk cache")
+            logger.info("Model %s found in disk cache", model_id)
             return str(self._model_disk_path(model_id))
 
-        if model_id in self._active_downloads:
-            logger.info(f"Download already in progress for {model_id}")
-            while model_id in self._active_downloads:
-                time.sleep(1)
-            return str(self._model_disk_path(model_id))
+        with self._downloads_lock:
+            done = self._active_downloads.get(model_id)
+            in_progress = done is not None
+            if not in_progress:
+                done = self._active_downloads[model_id] = threading.Event()
+                self._active_snapshot = tuple(self._active_downloads)
+
+        if in_progress:
+            logger.info("Download already in progress for %s", model_id)
+            done.wait()
+            path = self.get_disk_path(model_id)
+            if path is None:
+                raise DownloadError(model_id, "concurrent download failed")
+            return path
 
-        self._active_downloads.add(model_id)
-        logger.info(f"Starting download: {model_id}")
+        logger.info("Starting download: %s", model_id)
         try:
             path = self._download_sync(model_id)
-            logger.info(f"Download complete: {model_id}")
+            logger.info("Download complete: %s", model_id)
             return path
         finally:
-            self._active_downloads.discard(model_id)
+            with self._downloads_lock:
+                del self._active_downloads[model_id]
+                self._active_snapshot = tuple(self._active_downloads)
+            done.set()
 
     def list_cached_models(self) -> List[Dict[str, str]]:
         results = []
         if not self._cache_dir.exists():
             return results
-        for entry in self._cache_dir.iterdir():
-            if entry.is_dir():
-                model_id = entry.name.replace("--", "/")
+        # One readdir for the whole cache; entry types come with the names
+        with os.scandir(self._cache_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
                 results.append({
-                    "model_id": model_id,
-                    "path": str(entry),
+                    "model_id": entry.name.replace("--", "/"),
+                    "path": entry.path,
                     "state": ModelState.ON_DISK.value,
                 })
         return results
 
     @property
-    def active_downloads(self) -> Set[str]:
-        return set(self._active_downloads)
+    def active_downloads(self) -> Tuple[str, ...]:
+        return self._active_snapshot
@@ -1,56 +1,156 @@
 from __future__ import annotations
 
 import threading
-from typing import Any, Dict, Optional
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from src.config import settings
 from src.core.download_manager import DownloadManager
 from src.core.task_router import get_engine_class
 from src.core.vram_manager import VRAMManager
 from src.models.enums import ModelState, TaskType
 from src.models.model_info import ModelInfo
+from src.utils.gpu_utils import (
+    get_prefetch_stream,
+    model_stream,
+    record_prefetch_event,
+    wait_for_event,
+)
 from src.utils.logger import logger
+from src.utils.quantization import validate_quant
 
 
 class ModelManager:
     def __init__(self):
-        self.vram_manager = VRAMManager()
+        # Lock order: per-model lock -> _vram_lock. _registry_lock is only
+        # ever held briefly and never while acquiring another lock. A
+        # per-model lock is held while its model loads or serves a request.
+        # Eviction takes other models' locks under _vram_lock (waiting with a
+        # timeout only when nothing idle is left), so code holding a model
+        # lock never blocks on _vram_lock mid-request (see prefetch).
+        # Per-model locks only exist while someone holds or waits on them.
+        self._registry_lock = threading.Lock()
+        self._model_locks: Dict[str, threading.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self.vram_manager = VRAMManager(hold_model=self._hold)
         self.download_manager = DownloadManager()
-        self._lock = threading.Lock()
+        # Serializes eviction, GPU loads and registration against each other
+        self._vram_lock = threading.RLock()
         self._model_registry: Dict[str, ModelInfo] = {}
+        self._prefetch_events: Dict[str, Any] = {}
 
     def load_model(
         self,
         model_id: str,
         task_type: TaskType,
         force_reload: bool = False,
+        quant: Optional[str] = None,
     ) -> ModelInfo:
-        with self._lock:
-            existing = self._model_registry.get(model_id)
-            if existing and existing.state == ModelState.LOADED and not force_reload:
-                existing.touch()
-                self.vram_manager.update_access_time(model_id)
-                return existing
-
-            if force_reload and existing and existing.state == ModelState.LOADED:
-                self.vram_manager.unregister_model(model_id)
-
-            # Download if needed
-            info = ModelInfo(model_id=model_id, task_type=task_type)
-            info.state = ModelState.DOWNLOADING
+        with self._use(model_id, task_type, force_reload, quant) as info:
+            return info
+
+    @contextmanager
+    def _use(
+        self,
+        model_id: str,
+        task_type: TaskType,
+        force_reload: bool = False,
+        quant: Optional[str] = None,
+    ) -> Iterator[ModelInfo]:
+        default_quant = quant is None
+        engine_cls, quant = self._engine_for(task_type, quant)
+        # Requests for other models download and load without waiting on this
+        # one; the lock stays held until the caller is done with the engine
+        with self._hold(model_id):
+            yield self._load_locked(
+                model_id, task_type, engine_cls, force_reload, quant, default_quant
+            )
+
+    @staticmethod
+    def _engine_for(task_type: TaskType, quant: Optional[str]) -> Tuple[type, str]:
+        engine_cls = get_engine_class(task_type)
+        if quant is None:
+            # The global default only applies to tasks that support it
+            quant = settings.quantization
+            if quant not in engine_cls.supported_quant:
+                quant = "none"
+        validate_quant(quant, engine_cls.supported_quant)
+        return engine_cls, quant
+
+    @contextmanager
+    def _hold(self, model_id: str, blocking: bool = True, timeout: float = -1) -> Iterator[bool]:
+        # Refcounted so IDs that fail to load, or that were evicted or purged,
+        # don't leave a lock behind for every model_id a client ever sent
+        with self._registry_lock:
+            lock = self._model_locks.setdefault(model_id, threading.Lock())
+            self._lock_users[model_id] = self._lock_users.get(model_id, 0) + 1
+        acquired = lock.acquire(blocking, timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+            with self._registry_lock:
+                self._lock_users[model_id] -= 1
+                if not self._lock_users[model_id]:
+                    del self._lock_users[model_id]
+                    del self._model_locks[model_id]
+
+    def _load_locked(
+        self,
+        model_id: str,
+        task_type: TaskType,
+        engine_cls: type,
+        force_reload: bool,
+        quant: str,
+        default_quant: bool = False,
+    ) -> ModelInfo:
+        existing = self._model_registry.get(model_id)
+        if existing and existing.quant != quant:
+            force_reload = True
+        if existing and existing.state == ModelState.LOADED and not force_reload:
+            existing.touch()
+            self.vram_manager.update_access_time(model_id)
+            return existing
+
+        if existing and existing.state == ModelState.OFFLOADED and not force_reload:
+            with self._vram_lock:
+                return self._restore(existing)
+
+        # A resident engine with the same settings reloads its weights in
+        # place, keeping tokenizers/processors it has already built
+        reused = None
+        if (
+            force_reload and existing
+            and existing.state in (ModelState.LOADED, ModelState.OFFLOADED)
+            and existing.quant == quant
+            and existing.task_type == task_type
+        ):
+            reused = existing.engine_instance
+
+        if force_reload:
+            self.download_manager.invalidate(model_id)
+            with self._vram_lock:
+                if existing and existing.state == ModelState.LOADED:
+                    self.vram_manager.unregister_model(model_id, unload=reused is None)
+                elif existing and existing.state == ModelState.OFFLOADED and reused is None:
+                    existing.engine_instance.unload()
+
+        info = ModelInfo(model_id=model_id, task_type=task_type, quant=quant)
+        info.state = ModelState.DOWNLOADING
+        with self._registry_lock:
             self._model_registry[model_id] = info
 
-        # Download outside lock
         disk_path = self.download_manager.download(model_id)
+        self.download_manager.readahead(disk_path)
+        info.disk_path = disk_path
+        info.state = ModelState.ON_DISK
 
-        with self._lock:
-            info = self._model_registry[model_id]
-            info.disk_path = disk_path
-            info.state = ModelState.ON_DISK
-
-            # Create engine and estimate VRAM
-            engine_cls = get_engine_class(task_type)
-            engine = engine_cls(model_id)
+        # Create engine and estimate VRAM
+        engine = reused or engine_cls(model_id, quant, default_quant)
 
+        with self._vram_lock:
             # Evict if needed (estimate ~2GB if unknown)
             required_gb = 2.0
             if not self.vram_manager.can_load_model(required_gb):
@@ -58,19 +158,81 @@ class ModelManager:
 
             # Load model
             try:
-                engine.load(disk_path)
+                if reused is not None:
+                    engine.reload(disk_path)
+                else:
+                    engine.load(disk_path)
             except Exception as e:
                 info.state = ModelState.FAILED
-                logger.error(f"Failed to load {model_id}: {e}")
+                logger.error("Failed to load %s: %s", model_id, e)
                 raise
 
+            if settings.offload_to_host:
+                engine.snapshot_host_weights()
+
             info.engine_instance = engine
-            info.vram_mb = engine.get_vram_usage_mb()
+            # Inference isn't serialized with loads, so an allocator delta
+            # would include other models' allocations; size the engine's own
+            # parameters and buffers, else fall back to its estimate
+            info.vram_mb = engine.resident_vram_mb() or engine.get_vram_usage_mb()
             info.state = ModelState.LOADED
             info.touch()
             self.vram_manager.register_model(info)
             return info
 
+    def _restore(self, info: ModelInfo) -> ModelInfo:
+        required_gb = info.vram_mb / 1024
+        if not self.vram_manager.can_load_model(required_gb):
+            self.vram_manager.evict_lru(required_gb)
+        # A prefetch that was evicted again before use left a stale event
+        self._prefetch_events.pop(info.model_id, None)
+        info.engine_instance.restore()
+        info.state = ModelState.LOADED
+        info.touch()
+        self.vram_manager.register_model(info)
+        return info
+
+    def prefetch(self, model_id: str) -> bool:
+        stream = get_prefetch_stream()
+        if stream is None:
+            return False
+        # A busy model is being loaded, restored or evicted right now; the
+        # prefetch is only speculative, so skip it rather than wait
+        with self._hold(model_id, blocking=False) as acquired:
+            if not acquired:
+                return False
+            # Called mid-request with this request's model locked, while a
+            # load may hold _vram_lock waiting for that model to finish
+            if not self._vram_lock.acquire(blocking=False):
+                return False
+            try:
+                info = self._model_registry.get(model_id)
+                if info is None or info.state != ModelState.OFFLOADED:
+                    return False
+                # Only use free headroom; never evict for a speculative load
+                if not self.vram_manager.can_load_model(info.vram_mb / 1024):
+                    return False
+                # Copies are queued on the prefetch stream; infer() waits on the event
+                info.engine_instance.restore(stream)
+                self._prefetch_events[model_id] = record_prefetch_event()
+                info.state = ModelState.LOADED
+                self.vram_manager.register_model(info)
+                logger.info("Prefetching %s into VRAM", model_id)
+                return True
+            finally:
+                self._vram_lock.release()
+
+    def _prefetch_upcoming(self, current_model_id: str):
+        for model_id in self.vram_manager.upcoming_models():
+            if model_id != current_model_id:
+                self.prefetch(model_id)
+                return
+
+    def _wait_for_prefetch(self, model_id: str):
+        event = self._prefetch_events.pop(model_id, None)
+        if event is not None:
+            wait_for_event(event)
+
     def infer(
         self,
         model_id: str,
@@ -79,32 +241,108 @@ class ModelManager:
         params: Dict[str, Any],
         force_reload: bool = False,
     ) -> Any:
-        info = self.load_model(model_id, task_type, force_reload)
-        result = info.engine_instance.infer(input_data, params)
-        self.vram_manager.update_access_time(model_id)
+        with self._use(model_id, task_type, force_reload, params.get("quant")) as info:
+            with model_stream(model_id):
+                self._wait_for_prefetch(model_id)
+                result = info.engine_instance.infer(input_data, params)
+            self.vram_manager.update_access_time(model_id)
         return result
 
+    def stream(
+        self,
+        model_id: str,
+        task_type: TaskType,
+        input_data: Any,
+        params: Dict[str, Any],
+        force_reload: bool = False,
+    ) -> Iterator[Any]:
+        # A generator, so the model stays locked until the stream is
+        # exhausted or closed; the model loads on the first next()
+        with self._use(model_id, task_type, force_reload, params.get("quant")) as info:
+            self._wait_for_prefetch(model_id)
+            self.vram_manager.update_access_time(model_id)
+            yield from info.engine_instance.stream(input_data, params)
+
+    def infer_batch(
+        self,
+        model_id: str,
+        task_type: TaskType,
+        inputs: List[Any],
+        params_list: List[Dict[str, Any]],
+        force_reload: bool = False,
+    ) -> List[Any]:
+        quant = params_list[0].get("quant")
+        if any(p.get("quant") != quant for p in params_list[1:]):
+            # Mixed quantization can't share one loaded copy of the model
+            return [
+                self.infer(model_id, task_type, i, p, force_reload)
+                for i, p in zip(inputs, params_list)
+            ]
+        with self._use(model_id, task_type, force_reload, quant) as info:
+            self._prefetch_upcoming(model_id)
+            # One stream per model lets batches for different models overlap on the GPU
+            with model_stream(model_id):
+                self._wait_for_prefetch(model_id)
+                results = info.engine_instance.infer_batch(inputs, params_list)
+            self.vram_manager.update_access_time(model_id)
+        return results
+
     def get_all_model_status(self) -> list:
+        # Returned dicts are serialized as-is, without ModelStatusItem
+        # validation, so keys and value types must match the schema exactly
+        # Loads register new entries concurrently; iterate over a snapshot
+        with self._registry_lock:
+            registry = dict(self._model_registry)
+        # last_used is monotonic; the API reports it as a Unix timestamp
+        wall_offset = time.time() - time.monotonic()
         statuses = []
-        for model_id, info in self._model_registry.items():
+        for info in registry.values():
             statuses.append({
                 "model_id": info.model_id,
                 "task_type": info.task_type.value,
                 "state": info.state.value,
                 "vram_mb": info.vram_mb,
-                "last_used": info.last_used,
+                "quant": info.quant,
+                "last_used": info.last_used + wall_offset,
             })
         # Include cached-only models
         for cached in self.download_manager.list_cached_models():
-            if cached["model_id"] not in self._model_registry:
-                statuses.append(cached)
+            if cached["model_id"] not in registry:
+                statuses.append({
+                    "model_id": cached["model_id"],
+                    "task_type": None,
+                    "state": cached["state"],
+                    "vram_mb": 0.0,
+                    "quant": None,
+                    "last_used": None,
+                })
         return statuses
 
-    def purge_all(self):
-        with self._lock:
-            self.vram_manager.purge_all()
-            self._model_registry.clear()
-            logger.info("All models purged")
+    def purge_all(self) -> List[str]:
+        with self._vram_lock:
+            evicted = self.vram_manager.purge_all()
+            # Offloaded models are not resident but still pin a host copy
+            with self._registry_lock:
+                offloaded = [
+                    info for info in self._model_registry.values()
+                    if info.state == ModelState.OFFLOADED
+                ]
+            for info in offloaded:
+                with self._hold(info.model_id, blocking=False) as acquired:
+                    if acquired and info.state == ModelState.OFFLOADED:
+                        info.engine_instance.unload()
+                        info.state = ModelState.ON_DISK
+            logger.info("All idle models purged")
+            return evicted
+
+    def reclaim(self, target_free_gb: Optional[float] = None) -> List[str]:
+        if target_free_gb is None:
+            return self.purge_all()
+        with self._vram_lock:
+            evicted = self.vram_manager.reclaim(target_free_gb)
+            logger.info("Reclaimed VRAM for %.1fGB free, evicted %s", target_free_gb, evicted)
+            return evicted
 
     def fetch_model(self, model_id: str) -> str:
+        self.vram_manager.hint(model_id)
         return self.download_manager.download(model_id)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+import httpx
+from huggingface_hub import HfApi, hf_hub_url
+from huggingface_hub.utils import build_hf_headers
+
+from src.utils.logger import logger
+
+# Files at least this large are split across parallel Range requests
+CHUNKED_MIN_BYTES = 64 * 1024 * 1024
+CONNECTIONS_PER_FILE = 8
+_STREAM_BLOCK = 1024 * 1024
+_SHARD_SUFFIX = re.compile(r"-\d+-of-\d+$")
+
+
+def download_repo(
+    repo_id: str,
+    local_dir: Path,
+    token: Optional[str],
+    ignore_patterns: List[str],
+    max_workers: int,
+) -> str:
+    info = HfApi(token=token).model_info(repo_id, files_metadata=True)
+    skipped = set(redundant_weight_files(s.rfilename for s in info.siblings))
+    files = [
+        s for s in info.siblings
+        if s.rfilename not in skipped
+        and not any(fnmatch(s.rfilename, p) for p in ignore_patterns)
+    ]
+    headers = build_hf_headers(token=token)
+    timeout = httpx.Timeout(30.0, read=120.0)
+    with httpx.Client(headers=headers, follow_redirects=True, timeout=timeout) as client:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = [
+                pool.submit(
+                    download_file,
+                    client,
+                    hf_hub_url(repo_id, s.rfilename, revision=info.sha),
+                    local_dir / s.rfilename,
+                    s.size,
+                    s.lfs.sha256 if s.lfs else None,
+                )
+                for s in files
+            ]
+            for future in futures:
+                future.result()
+    return str(local_dir)
+
+
+def redundant_weight_files(filenames: Iterable[str]) -> List[str]:
+    # Many repos ship each checkpoint as both .safetensors and a pickled
+    # .bin; from_pretrained prefers safetensors, so the .bin is never read.
+    # Only a .bin whose own safetensors counterpart exists is dropped, so
+    # e.g. *.fp16.safetensors variants never shadow the default weights.
+    filenames = list(filenames)
+    present = set(filenames)
+    redundant = []
+    for f in filenames:
+        if not f.endswith(".bin"):
+            continue
+        folder, name = os.path.split(f[: -len(".bin")])
+        base = _SHARD_SUFFIX.sub("", name)
+        names = {base}
+        if base.startswith("pytorch_model"):
+            # transformers: pytorch_model*.bin <-> model*.safetensors
+            names.add("model" + base[len("pytorch_model"):])
+        # Shards are covered by the safetensors index of the whole checkpoint
+        suffix = ".safetensors" if base == name else ".safetensors.index.json"
+        if any(os.path.join(folder, n + suffix) in present for n in names):
+            redundant.append(f)
+    return redundant
+
+
+def download_file(
+    client: httpx.Client,
+    url: str,
+    dest: Path,
+    size: Optional[int],
+    sha256: Optional[str] = None,
+):
+    if dest.exists() and size is not None and dest.stat().st_size == size:
+        return
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    incomplete = dest.with_name(dest.name + ".incomplete")
+    if size is not None and size >= CHUNKED_MIN_BYTES:
+        _download_chunked(client, url, incomplete, size)
+    else:
+        _download_single(client, url, incomplete)
+    if sha256 is not None and _sha256(incomplete) != sha256:
+        incomplete.unlink()
+        raise ValueError(f"Checksum mismatch for {dest.name}")
+    os.replace(incomplete, dest)
+
+
+def _download_single(client: httpx.Client, url: str, path: Path):
+    with client.stream("GET", url) as response, open(path, "wb") as f:
+        response.raise_for_status()
+        for block in response.iter_bytes(_STREAM_BLOCK):
+            f.write(block)
+
+
+def _download_chunked(client: httpx.Client, url: str, path: Path, size: int):
+    # Finished chunk indices are recorded in a sidecar so a restart resumes
+    sidecar = path.with_name(path.name + ".partial")
+    done: Set[int] = set()
+    if path.exists() and sidecar.exists():
+        done = set(json.loads(sidecar.read_text()))
+    else:
+        with open(path, "wb") as f:
+            f.truncate(size)
+
+    chunk = -(-size // CONNECTIONS_PER_FILE)
+    ranges = [
+        (i, i * chunk, min(size, (i + 1) * chunk) - 1)
+        for i in range(CONNECTIONS_PER_FILE)
+        if i * chunk < size
+    ]
+    lock = threading.Lock()
+
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), size) as view:
+        # Chunks write disjoint slices of the mapping, so they need no locking
+        def fetch(index: int, lo: int, hi: int):
+            headers = {"Range": f"bytes={lo}-{hi}"}
+            offset = lo
+            with client.stream("GET", url, headers=headers) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise ValueError(f"Server ignored Range request for {path.name}")
+                for block in response.iter_bytes(_STREAM_BLOCK):
+                    view[offset:offset + len(block)] = block
+                    offset += len(block)
+            if offset != hi + 1:
+                raise ValueError(f"Short read for {path.name} bytes {lo}-{hi}")
+            with lock:
+                done.add(index)
+                sidecar.write_text(json.dumps(sorted(done)))
+
+        pending = [r for r in ranges if r[0] not in done]
+        if len(pending) < len(ranges):
+            logger.info(
+                "Resuming %s: %s/%s chunks done",
+                path.name, len(ranges) - len(pending), len(ranges),
+            )
+        with ThreadPoolExecutor(max_workers=CONNECTIONS_PER_FILE) as pool:
+            for future in [pool.submit(fetch, *r) for r in pending]:
+                future.result()
+        view.flush()
+    sidecar.unlink(missing_ok=True)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_STREAM_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -1,11 +1,13 @@
 from typing import Dict, Type
 
+from src.config import settings
 from src.inference.base import BaseInferenceEngine
 from src.inference.image_engine import ImageEngine
 from src.inference.llm_engine import LLMEngine
 from src.inference.stt_engine import STTEngine
 from src.inference.tts_engine import TTSEngine
 from src.inference.video_engine import VideoEngine
+from src.inference.vllm_engine import VLLMEngine
 from src.models.enums import TaskType
 
 ENGINE_MAP: Dict[TaskType, Type[BaseInferenceEngine]] = {
@@ -18,4 +20,6 @@ ENGINE_MAP: Dict[TaskType, Type[BaseInferenceEngine]] = {
 
 
 def get_engine_class(task_type: TaskType) -> Type[BaseInferenceEngine]:
+    if task_type == TaskType.TEXT and settings.llm_backend == "vllm":
+        return VLLMEngine
     return ENGINE_MAP[task_type]
@@ -1,76 +1,227 @@
 from __future__ import annotations
 
-from typing import Dict
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Collection, ContextManager, Deque, Dict, Iterator, List, Optional, Set
 
 from src.config import settings
+from src.models.enums import ModelState
 from src.models.model_info import ModelInfo
 from src.utils.exceptions import VRAMExhaustedError
-from src.utils.gpu_utils import clear_gpu_cache, get_vram_total_gb, get_vram_usage_gb
+from src.utils.gpu_utils import (
+    clear_gpu_cache,
+    get_device_used_gb,
+    get_vram_total_gb,
+    get_vram_usage_gb,
+    release_model_stream,
+)
 from src.utils.logger import logger
 
+# Status, health and every execute response read usage; one read per window is plenty
+USAGE_TTL_S = 0.05
+# A fetched model that is never executed stops being protected after this
+HINT_TTL_S = 300.0
+# How long a load waits for a model that is mid-request before giving up
+EVICTION_WAIT_S = 30.0
+
+
+@contextmanager
+def _hold_nothing(model_id: str, blocking: bool = True, timeout: float = -1) -> Iterator[bool]:
+    yield True
+
 
 class VRAMManager:
-    def __init__(self):
-        self._loaded_models: Dict[str, ModelInfo] = {}
+    def __init__(self, hold_model: Optional[Callable[..., ContextManager[bool]]] = None):
+        # Least recently used first; kept in order by register/update_access_time
+        self._loaded_models: OrderedDict[str, ModelInfo] = OrderedDict()
         self._threshold = settings.vram_threshold
         self._max_vram_gb = settings.max_vram_gb
+        self._lookahead = settings.eviction_lookahead
+        # Model IDs of requests waiting for inference, oldest first
+        self._pending: Deque[str] = deque()
+        # Models announced via /v1/models/fetch that are expected soon,
+        # mapped to the monotonic time the hint expires
+        self._hints: Dict[str, float] = {}
+        self._usage_percent = 0.0
+        self._usage_read_at = float("-inf")
+        # Device capacity never changes, so it is read once
+        self._total_gb: Optional[float] = None
+        # Acquires ModelManager's per-model lock, yielding whether it got it;
+        # one is held while its model loads or serves a request, and eviction
+        # must not swap weights under it
+        self._hold_model = hold_model or _hold_nothing
 
     @property
     def loaded_models(self) -> Dict[str, ModelInfo]:
         return dict(self._loaded_models)
 
+    def _get_total_gb(self) -> float:
+        if self._total_gb is None:
+            self._total_gb = get_vram_total_gb()
+        return self._total_gb
+
     def get_effective_limit_gb(self) -> float:
-        total = get_vram_total_gb()
+        total = self._get_total_gb()
         if total > 0:
             return total * self._threshold
         return self._max_vram_gb * self._threshold
 
-    def can_load_model(self, required_gb: float) -> bool:
-        current = get_vram_usage_gb()
+    def get_free_vram_gb(self) -> float:
+        return max(0.0, self.get_effective_limit_gb() - get_vram_usage_gb())
+
+    def can_load_model(self, required_gb: float, current_gb: Optional[float] = None) -> bool:
+        current = get_vram_usage_gb() if current_gb is None else current_gb
         limit = self.get_effective_limit_gb()
         return (current + required_gb) <= limit
 
     def register_model(self, info: ModelInfo):
         self._loaded_models[info.model_id] = info
-        logger.info(
-            f"Registered model {info.model_id} "
-            f"(VRAM: {info.vram_mb:.0f}MB)"
-        )
+        self._loaded_models.move_to_end(info.model_id)
+        self._invalidate_usage()
+        logger.info("Registered model %s (VRAM: %.0fMB)", info.model_id, info.vram_mb)
 
-    def unregister_model(self, model_id: str):
+    def unregister_model(self, model_id: str, unload: bool = True):
         info = self._loaded_models.pop(model_id, None)
-        if info and info.engine_instance:
+        if info and info.engine_instance and unload:
             info.engine_instance.unload()
+            self._hints.pop(model_id, None)
+            self._invalidate_usage()
+            logger.info("Unloaded model %s", model_id)
+
+    def evict(self, model_id: str, offload: bool = True):
+        info = self._loaded_models.pop(model_id, None)
+        if info is None:
+            return
+        # A hint only protects the copy that was warmed for it
+        self._hints.pop(model_id, None)
+        release_model_stream(model_id)
+        engine = info.engine_instance
+        if offload and engine and engine.can_offload:
+            # Swap to the pinned host copy instead of freeing the weights
+            engine.offload()
+            info.state = ModelState.OFFLOADED
+            logger.info("Offloaded model %s to host memory", model_id)
+        else:
+            if engine:
+                engine.unload()
+            info.state = ModelState.ON_DISK
+            logger.info("Unloaded model %s", model_id)
+        self._invalidate_usage()
+
+    def mark_pending(self, model_id: str):
+        self._pending.append(model_id)
+
+    def mark_done(self, model_id: str):
+        try:
+            self._pending.remove(model_id)
+        except ValueError:
+            pass
+        self._hints.pop(model_id, None)
+
+    def hint(self, model_id: str):
+        now = time.monotonic()
+        # Expired hints are dropped here so IDs that are never loaded don't pile up
+        for stale in [m for m, expires in self._hints.items() if expires <= now]:
+            del self._hints[stale]
+        self._hints[model_id] = now + HINT_TTL_S
+
+    def _is_hinted(self, model_id: str, now: float) -> bool:
+        return self._hints.get(model_id, 0.0) > now
+
+    def upcoming_models(self) -> List[str]:
+        return list(dict.fromkeys(tuple(self._pending)[: self._lookahead]))
+
+    def choose_victim(self, skip: Collection[str] = ()) -> Optional[ModelInfo]:
+        # Snapshot: update_access_time reorders the dict from inference threads
+        candidates = [
+            info for info in tuple(self._loaded_models.values())
+            if info.model_id not in skip
+        ]
+        if not candidates:
+            return None
+        # Position of each model's next use among the next K queued requests;
+        # live hints rank right after the window, everything else never.
+        upcoming: Dict[str, float] = {}
+        for position, model_id in enumerate(tuple(self._pending)[: self._lookahead]):
+            upcoming.setdefault(model_id, position)
+        now = time.monotonic()
+        for info in candidates:
+            if info.model_id not in upcoming and self._is_hinted(info.model_id, now):
+                upcoming[info.model_id] = self._lookahead
+        for info in candidates:
+            if info.model_id not in upcoming:
+                return info
+        # Every model is needed soon: evict the one needed last (LRU on ties)
+        return max(candidates, key=lambda m: upcoming[m.model_id])
+
+    def reclaim(self, target_free_gb: Optional[float] = None, offload: bool = True) -> List[str]:
+        evicted = []
+        busy: Set[str] = set()
+        # Poll usage once, then account for each eviction locally; callers
+        # that need certainty (evict_lru) re-check after the loop
+        current_gb = get_vram_usage_gb()
+        while target_free_gb is None or not self.can_load_model(target_free_gb, current_gb):
+            victim = self.choose_victim(busy)
+            if victim is not None:
+                with self._hold_model(victim.model_id, blocking=False) as acquired:
+                    if acquired:
+                        self._evict_victim(victim, offload)
+                if not acquired:
+                    busy.add(victim.model_id)
+                    continue
+            elif target_free_gb is not None and busy:
+                # Only models serving a request are left: wait for the best
+                # victim among them to finish rather than fail the load. A
+                # purge (no target) just leaves them resident.
+                victim = self.choose_victim(set(self._loaded_models) - busy)
+                if victim is None:
+                    break
+                with self._hold_model(victim.model_id, timeout=EVICTION_WAIT_S) as acquired:
+                    if acquired:
+                        self._evict_victim(victim, offload)
+                if not acquired:
+                    break
+                busy.discard(victim.model_id)
+            else:
+                break
+            evicted.append(victim.model_id)
+            current_gb = max(0.0, current_gb - victim.vram_mb / 1024)
+        # empty_cache() synchronizes the device, so release the cache once
+        # per batch of evictions rather than after each model
+        if evicted:
             clear_gpu_cache()
-            logger.info(f"Unloaded model {model_id}")
+        return evicted
 
-    def evict_lru(self, required_gb: float):
-        sorted_models = sorted(
-            self._loaded_models.values(), key=lambda m: m.last_used
-        )
-        for model_info in sorted_models:
-            if self.can_load_model(required_gb):
-                return
-            logger.info(f"Evicting LRU model: {model_info.model_id}")
-            self.unregister_model(model_info.model_id)
+    def _evict_victim(self, victim: ModelInfo, offload: bool):
+        logger.info("Evicting model: %s", victim.model_id)
+        self.evict(victim.model_id, offload)
 
+    def evict_lru(self, required_gb: float):
+        self.reclaim(required_gb)
         if not self.can_load_model(required_gb):
-            available = self.get_effective_limit_gb() - get_vram_usage_gb()
-            raise VRAMExhaustedError(required_gb, max(0, available))
+            raise VRAMExhaustedError(required_gb, self.get_free_vram_gb())
 
     def update_access_time(self, model_id: str):
-        if model_id in self._loaded_models:
-            self._loaded_models[model_id].touch()
+        info = self._loaded_models.get(model_id)
+        if info is not None:
+            self._loaded_models.move_to_end(model_id)
+            info.touch()
 
     def get_vram_usage_percent(self) -> float:
-        total = get_vram_total_gb()
-        if total == 0:
-            return 0.0
-        return get_vram_usage_gb() / total * 100
-
-    def purge_all(self):
-        model_ids = list(self._loaded_models.keys())
-        for model_id in model_ids:
-            self.unregister_model(model_id)
-        clear_gpu_cache()
-        logger.info("All models purged from VRAM")
+        now = time.monotonic()
+        if now - self._usage_read_at < USAGE_TTL_S:
+            return self._usage_percent
+        total = self._get_total_gb()
+        self._usage_percent = get_device_used_gb() / total * 100 if total else 0.0
+        self._usage_read_at = now
+        return self._usage_percent
+
+    def _invalidate_usage(self):
+        self._usage_read_at = float("-inf")
+
+    def purge_all(self) -> List[str]:
+        # A purge frees the host copies too, rather than offloading to them
+        evicted = self.reclaim(offload=False)
+        logger.info("All idle models purged from VRAM")
+        return evicted
@@ -0,0 +1,119 @@
+# Example payloads for the OpenAPI docs. Only imported while a JSON schema
+# is being generated (see src.schemas._examples), never on the request path
+
+EXECUTE_REQUEST = [
+    {
+        "model_id": "gpt2",
+        "input": "The future of AI is",
+        "params": {"max_length": 100, "temperature": 0.7},
+        "force_reload": False,
+    },
+    {
+        "model_id": "stabilityai/stable-diffusion-2-1",
+        "input": "A photo of an astronaut riding a horse on the moon",
+        "params": {
+            "guidance_scale": 7.5,
+            "num_inference_steps": 30,
+            "width": 512,
+            "height": 512,
+        },
+        "force_reload": False,
+    },
+    {
+        "model_id": "Qwen/Qwen3-TTS",
+        "input": "Today is a wonderful day to build something people love.",
+        "params": {"speaker": "Chelsie", "speed": 1.0},
+        "force_reload": False,
+    },
+    {
+        "model_id": "openai/whisper-small",
+        "input": "<base64-encoded-audio-bytes>",
+        "params": {"language": "en", "task": "transcribe"},
+        "force_reload": False,
+    },
+]
+
+EXECUTE_RESPONSE = [
+    {
+        "model_id": "gpt2",
+        "task_type": "text",
+        "result": {"generated_text": "The future of AI is bright and full of possibilities..."},
+        "vram_usage_percent": 34.5,
+    },
+    {
+        "model_id": "stabilityai/stable-diffusion-2-1",
+        "task_type": "image",
+        "result": {"image_base64": "<base64-encoded-png>", "format": "png"},
+        "vram_usage_percent": 72.1,
+    },
+    {
+        "model_id": "Qwen/Qwen3-TTS",
+        "task_type": "audio_tts",
+        "result": {"audio_base64": "<base64-encoded-wav>", "format": "wav", "sample_rate": 24000},
+        "vram_usage_percent": 41.3,
+    },
+    {
+        "model_id": "openai/whisper-small",
+        "task_type": "audio_stt",
+        "result": {"text": "Hello, how are you doing today?"},
+        "vram_usage_percent": 28.7,
+    },
+]
+
+MODEL_STATUS_RESPONSE = [
+    {
+        "models": [
+            {
+                "model_id": "gpt2",
+                "task_type": "text",
+                "state": "loaded",
+                "vram_mb": 548.0,
+                "last_used": 1708099200.0,
+            },
+            {
+                "model_id": "stabilityai/stable-diffusion-2-1",
+                "task_type": "image",
+                "state": "on_disk",
+                "vram_mb": 0.0,
+                "last_used": None,
+            },
+        ],
+        "vram_usage_percent": 34.5,
+        "active_downloads": [],
+    }
+]
+
+FETCH_REQUEST = [
+    {"model_id": "gpt2"},
+    {"model_id": "stabilityai/stable-diffusion-2-1", "task_type": "image"},
+    {"model_id": "Qwen/Qwen3-TTS"},
+    {"model_id": "openai/whisper-small"},
+]
+
+FETCH_RESPONSE = [
+    {
+        "model_id": "gpt2",
+        "path": "/app/models/gpt2",
+        "message": "Model gpt2 is available on disk",
+    },
+    {
+        "model_id": "Qwen/Qwen3-TTS",
+        "path": "/app/models/Qwen--Qwen3-TTS",
+        "message": "Model Qwen/Qwen3-TTS is available on disk",
+    },
+]
+
+PURGE_RESPONSE = [
+    {
+        "message": "All models purged from VRAM",
+        "freed_mb": 6144.0,
+        "evicted": ["gpt2", "stabilityai/stable-diffusion-2-1"],
+    },
+    {
+        "message": "Reclaimed VRAM until 4.0GB is free",
+        "freed_mb": 548.0,
+        "evicted": ["gpt2"],
+    },
+]
+
+ERROR_RESPONSE = [{"detail": "Model not found: nonexistent/model"}]
@@ -1,14 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional
+
+import torch
 
 from src.config import settings
+from src.utils.gpu_utils import cuda_module_bytes, host_state_dict, swap_state_dict
 
 
 class BaseInferenceEngine(ABC):
-    def __init__(self, model_id: str):
+    supported_quant: tuple = ("none",)
+
+    def __init__(self, model_id: str, quant: str = "none", default_quant: bool = False):
         self.model_id = model_id
+        self.quant = quant
+        # True when quant came from the global setting rather than the request
+        self.default_quant = default_quant
         self.device = settings.device
         self._loaded = False
+        self._host_weights: Dict[str, Dict[str, Any]] = {}
 
     @abstractmethod
     def load(self, model_path: str) -> None:
@@ -18,14 +27,60 @@ class BaseInferenceEngine(ABC):
     def unload(self) -> None:
         pass
 
+    def reload(self, model_path: str) -> None:
+        # Engines override this to keep state that doesn't depend on weights
+        self.unload()
+        self.load(model_path)
+
     @abstractmethod
     def infer(self, input_data: Any, params: Dict[str, Any]) -> Any:
         pass
 
+    def infer_batch(
+        self, inputs: List[Any], params_list: List[Dict[str, Any]]
+    ) -> List[Any]:
+        return [self.infer(i, p) for i, p in zip(inputs, params_list)]
+
+    def stream(self, input_data: Any, params: Dict[str, Any]) -> Iterator[Any]:
+        # Engines without incremental output emit the whole result once
+        yield self.infer(input_data, params)
+
     @abstractmethod
     def get_vram_usage_mb(self) -> float:
         pass
 
+    def _offloadable_modules(self) -> Dict[str, Any]:
+        return {}
+
+    def resident_vram_mb(self) -> float:
+        # Only this engine's own tensors, so other models allocating or
+        # freeing concurrently don't skew it; 0 for engines without modules
+        return cuda_module_bytes(self._offloadable_modules().values()) / (1024 ** 2)
+
+    def snapshot_host_weights(self) -> None:
+        # Quantized weights (bitsandbytes/torchao) can't be swapped via state dicts
+        if self.device != "cuda" or self.quant != "none":
+            return
+        self._host_weights = {
+            name: host_state_dict(module)
+            for name, module in self._offloadable_modules().items()
+        }
+
+    @property
+    def can_offload(self) -> bool:
+        return bool(self._host_weights)
+
+    def offload(self) -> None:
+        for name, module in self._offloadable_modules().items():
+            swap_state_dict(module, self._host_weights[name], "cpu")
+        self._loaded = False
+
+    def restore(self, stream: Optional[Any] = None) -> None:
+        with torch.cuda.stream(stream):
+            for name, module in self._offloadable_modules().items():
+                swap_state_dict(module, self._host_weights[name], self.device)
+        self._loaded = True
+
     @property
     def is_loaded(self) -> bool:
         return self._loaded
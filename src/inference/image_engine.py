@@ -1,41 +1,75 @@
-import base64
 import io
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import torch
 
+from src.config import settings
 from src.inference.base import BaseInferenceEngine
-from src.utils.gpu_utils import clear_gpu_cache
+from src.utils.encoding import binary_result
+from src.utils.gpu_utils import cuda_dtype
 from src.utils.logger import logger
+from src.utils.quantization import quantize_weights
+
+# PIL save() options per output format, tuned for encode speed: PNG at
+# compress_level=1 is ~3x faster than the default 6 for ~20% more bytes,
+# and WebP method=0 is the fastest encoder preset
+IMAGE_FORMATS = {
+    "png": ("PNG", {"compress_level": 1}),
+    "webp": ("WEBP", {"quality": 90, "method": 0}),
+    "jpeg": ("JPEG", {"quality": 90}),
+}
 
 
 class ImageEngine(BaseInferenceEngine):
-    def __init__(self, model_id: str):
-        super().__init__(model_id)
+    supported_quant = ("none", "int8", "fp8")
+
+    def __init__(self, model_id: str, quant: str = "none", default_quant: bool = False):
+        super().__init__(model_id, quant, default_quant)
         self._pipeline = None
 
     def load(self, model_path: str) -> None:
         from diffusers import StableDiffusionPipeline
 
-        logger.info(f"Loading image model: {self.model_id}")
-        dtype = torch.float16 if self.device == "cuda" else torch.float32
+        logger.info("Loading image model: %s", self.model_id)
+        dtype = cuda_dtype() if self.device == "cuda" else torch.float32
         self._pipeline = StableDiffusionPipeline.from_pretrained(
-            model_path, torch_dtype=dtype
+            model_path, torch_dtype=dtype, low_cpu_mem_usage=True
         )
         if self.device == "cuda":
             self._pipeline = self._pipeline.to(self.device)
+            self._enable_efficient_attention()
+        # Decode the latents in tiles/slices so large images fit in VRAM
+        self._pipeline.vae.enable_tiling()
+        self._pipeline.vae.enable_slicing()
+        # The UNet holds most of the weights; quantize it only
+        quantize_weights(self._pipeline.unet, self.quant)
+        if settings.torch_compile and self.device == "cuda":
+            self._pipeline.unet = torch.compile(
+                self._pipeline.unet, mode="reduce-overhead", fullgraph=False
+            )
+            self._pipeline.vae.decode = torch.compile(
+                self._pipeline.vae.decode, mode="reduce-overhead"
+            )
         self._loaded = True
-        logger.info(f"Image model loaded: {self.model_id}")
+        logger.info("Image model loaded: %s", self.model_id)
+
+    def _enable_efficient_attention(self):
+        try:
+            self._pipeline.enable_xformers_memory_efficient_attention()
+        except (ImportError, ValueError) as e:
+            from diffusers.models.attention_processor import AttnProcessor2_0
+
+            logger.info("xformers unavailable (%s), using PyTorch SDPA attention", e)
+            self._pipeline.unet.set_attn_processor(AttnProcessor2_0())
 
     def unload(self) -> None:
         del self._pipeline
         self._pipeline = None
+        self._host_weights = {}
         self._loaded = False
-        clear_gpu_cache()
-        logger.info(f"Image model unloaded: {self.model_id}")
+        logger.info("Image model unloaded: %s", self.model_id)
 
-    def infer(self, input_data: Any, params: Dict[str, Any]) -> Any:
-        prompt = str(input_data)
+    def _generate(self, prompt: Any, params: Dict[str, Any]) -> list:
         guidance_scale = params.get("guidance_scale", 7.5)
         num_inference_steps = params.get("num_inference_steps", 50)
         width = params.get("width", 512)
@@ -49,12 +83,38 @@ class ImageEngine(BaseInferenceEngine):
                 width=width,
                 height=height,
             )
+        return result.images
 
-        image = result.images[0]
+    @staticmethod
+    def _encode(image, params: Dict[str, Any]) -> Dict[str, Any]:
+        fmt = params.get("format") or "png"
+        pil_format, options = IMAGE_FORMATS[fmt]
         buffer = io.BytesIO()
-        image.save(buffer, format="PNG")
-        image_b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-        return {"image_base64": image_b64, "format": "png"}
+        image.save(buffer, format=pil_format, **options)
+        return binary_result(buffer.getbuffer(), "image_base64", params, format=fmt)
+
+    def infer(self, input_data: Any, params: Dict[str, Any]) -> Any:
+        image = self._generate(str(input_data), params)[0]
+        return self._encode(image, params)
+
+    def infer_batch(
+        self, inputs: List[Any], params_list: List[Dict[str, Any]]
+    ) -> List[Any]:
+        params = params_list[0]
+        if len(inputs) == 1 or any(p != params for p in params_list[1:]):
+            return super().infer_batch(inputs, params_list)
+        images = self._generate([str(i) for i in inputs], params)
+        return [self._encode(image, params) for image in images]
+
+    def _offloadable_modules(self) -> Dict[str, Any]:
+        if self._pipeline is None:
+            return {}
+        modules = {}
+        for component_name in ["unet", "vae", "text_encoder"]:
+            component = getattr(self._pipeline, component_name, None)
+            if isinstance(component, torch.nn.Module):
+                modules[component_name] = component
+        return modules
 
     def get_vram_usage_mb(self) -> float:
         if self._pipeline is None:
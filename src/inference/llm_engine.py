@@ -1,67 +1,233 @@
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Iterator, List, Tuple
 
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
 
+from src.config import settings
 from src.inference.base import BaseInferenceEngine
-from src.utils.gpu_utils import clear_gpu_cache
+from src.utils.gpu_utils import cuda_dtype
 from src.utils.logger import logger
+from src.utils.quantization import bnb_config, quantize_weights
+
+
+class _Cancelled(StoppingCriteria):
+    def __init__(self, event: threading.Event):
+        self._event = event
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        return torch.full(
+            (input_ids.shape[0],), self._event.is_set(), dtype=torch.bool, device=input_ids.device
+        )
 
 
 class LLMEngine(BaseInferenceEngine):
-    def __init__(self, model_id: str):
-        super().__init__(model_id)
+    supported_quant = ("none", "int8", "fp8", "nf4")
+
+    def __init__(self, model_id: str, quant: str = "none", default_quant: bool = False):
+        super().__init__(model_id, quant, default_quant)
         self._model = None
         self._tokenizer = None
+        # Pinned (input_ids, attention_mask) staging buffers per prompt bucket
+        self._staging: Dict[int, Tuple[torch.Tensor, torch.Tensor]] = {}
 
     def load(self, model_path: str) -> None:
-        logger.info(f"Loading LLM: {self.model_id} from {model_path}")
-        dtype = torch.float16 if self.device == "cuda" else torch.float32
+        logger.info("Loading LLM: %s from %s", self.model_id, model_path)
         self._tokenizer = AutoTokenizer.from_pretrained(
             model_path, trust_remote_code=True
         )
+        # Decoder-only models need left padding for batched generation
+        self._tokenizer.padding_side = "left"
+        if self._tokenizer.pad_token is None:
+            self._tokenizer.pad_token = self._tokenizer.eos_token
+        self._load_weights(model_path)
+        logger.info("LLM loaded: %s", self.model_id)
+
+    def reload(self, model_path: str) -> None:
+        # The tokenizer is CPU-only and unchanged on disk; only reload weights
+        logger.info("Reloading LLM weights: %s", self.model_id)
+        self._unload_weights()
+        self._load_weights(model_path)
+
+    def _load_weights(self, model_path: str) -> None:
+        dtype = cuda_dtype() if self.device == "cuda" else torch.float32
         self._model = AutoModelForCausalLM.from_pretrained(
             model_path,
             torch_dtype=dtype,
-            device_map=self.device if self.device == "cuda" else None,
+            # Safetensors are materialized straight on the GPU, with no
+            # full CPU copy followed by a .to() transfer
+            device_map={"": self.device} if self.device == "cuda" else None,
+            low_cpu_mem_usage=True,
             trust_remote_code=True,
+            quantization_config=bnb_config(self.quant),
         )
-        if self.device == "cuda" and self._model.device.type != "cuda":
-            self._model = self._model.to(self.device)
+        # Set once so generate() doesn't resolve (and warn about) it per call
+        self._model.generation_config.pad_token_id = self._tokenizer.pad_token_id
+        quantize_weights(self._model, self.quant)
+        if settings.torch_compile and self.device == "cuda":
+            # A static KV cache keeps decode shapes fixed, so each step
+            # replays one compiled graph instead of recompiling as it grows
+            self._model.generation_config.cache_implementation = "static"
+            self._model.forward = torch.compile(self._model.forward, mode="reduce-overhead")
         self._loaded = True
-        logger.info(f"LLM loaded: {self.model_id}")
 
-    def unload(self) -> None:
+    def _unload_weights(self) -> None:
         del self._model
-        del self._tokenizer
         self._model = None
-        self._tokenizer = None
+        self._staging = {}
+        self._host_weights = {}
         self._loaded = False
-        clear_gpu_cache()
-        logger.info(f"LLM unloaded: {self.model_id}")
+
+    def unload(self) -> None:
+        self._unload_weights()
+        del self._tokenizer
+        self._tokenizer = None
+        logger.info("LLM unloaded: %s", self.model_id)
+
+    @staticmethod
+    def _generation_kwargs(params: Dict[str, Any]) -> Dict[str, Any]:
+        temperature = params.get("temperature", 1.0)
+        return {
+            "temperature": temperature,
+            "top_p": params.get("top_p", 1.0),
+            "do_sample": params.get("do_sample", temperature != 1.0),
+        }
+
+    def _use_cuda_graphs(self, params: Dict[str, Any]) -> bool:
+        return (
+            settings.llm_cuda_graphs
+            and self._model.device.type == "cuda"
+            and not self._generation_kwargs(params)["do_sample"]
+        )
+
+    def _infer_graphed(self, prompt: str, max_length: int) -> Dict[str, Any]:
+        ids = self._tokenizer(prompt, return_tensors="pt")["input_ids"][0]
+        # Left-pad to the next power of two so prefill and the static KV cache
+        # only ever see a handful of shapes, each captured as a CUDA graph once
+        bucket = 1 << max(0, len(ids) - 1).bit_length()
+        staging = self._staging.get(bucket)
+        if staging is None:
+            staging = self._staging[bucket] = (
+                torch.empty((1, bucket), dtype=torch.long, pin_memory=True),
+                torch.empty((1, bucket), dtype=torch.long, pin_memory=True),
+            )
+        input_ids, attention_mask = staging
+        pad = bucket - len(ids)
+        input_ids[0, :pad] = self._tokenizer.pad_token_id
+        input_ids[0, pad:] = ids
+        attention_mask[0, :pad] = 0
+        attention_mask[0, pad:] = 1
+
+        with torch.inference_mode():
+            outputs = self._model.generate(
+                input_ids=input_ids.to(self._model.device, non_blocking=True),
+                attention_mask=attention_mask.to(self._model.device, non_blocking=True),
+                max_new_tokens=max(max_length - len(ids), 1),
+                do_sample=False,
+                cache_implementation="static",
+            )
+
+        text = self._tokenizer.decode(outputs[0], skip_special_tokens=True)
+        return {"generated_text": text}
 
     def infer(self, input_data: Any, params: Dict[str, Any]) -> Any:
         prompt = str(input_data)
         max_length = params.get("max_length", 100)
-        temperature = params.get("temperature", 1.0)
-        top_p = params.get("top_p", 1.0)
-        do_sample = params.get("do_sample", temperature != 1.0)
+        if self._use_cuda_graphs(params):
+            return self._infer_graphed(prompt, max_length)
 
-        inputs = self._tokenizer(prompt, return_tensors="pt")
-        inputs = {k: v.to(self._model.device) for k, v in inputs.items()}
+        inputs = self._tokenizer(prompt, return_tensors="pt").to(self._model.device)
 
-        with torch.no_grad():
+        with torch.inference_mode():
             outputs = self._model.generate(
                 **inputs,
                 max_length=max_length,
-                temperature=temperature,
-                top_p=top_p,
-                do_sample=do_sample,
+                **self._generation_kwargs(params),
             )
 
         text = self._tokenizer.decode(outputs[0], skip_special_tokens=True)
         return {"generated_text": text}
 
+    def stream(self, input_data: Any, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        inputs = self._tokenizer(str(input_data), return_tensors="pt").to(self._model.device)
+        streamer = TextIteratorStreamer(
+            self._tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        errors: List[Exception] = []
+        # Set when the consumer stops early (e.g. the client disconnected)
+        cancel = threading.Event()
+
+        def generate():
+            try:
+                with torch.inference_mode():
+                    self._model.generate(
+                        **inputs,
+                        max_length=params.get("max_length", 100),
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([_Cancelled(cancel)]),
+                        **self._generation_kwargs(params),
+                    )
+            except Exception as e:
+                errors.append(e)
+                # Unblock the consumer, which would otherwise wait forever
+                streamer.end()
+
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+        try:
+            for delta in streamer:
+                if delta:
+                    yield {"delta": delta}
+        finally:
+            # Closing the generator stops generate() at its next step, and the
+            # model isn't released to the next request until it has returned
+            cancel.set()
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def infer_batch(
+        self, inputs: List[Any], params_list: List[Dict[str, Any]]
+    ) -> List[Any]:
+        params = params_list[0]
+        if len(inputs) == 1 or any(p != params for p in params_list[1:]):
+            return super().infer_batch(inputs, params_list)
+
+        max_length = params.get("max_length", 100)
+        encoded = self._tokenizer(
+            [str(i) for i in inputs], return_tensors="pt", padding=True
+        )
+        prompt_lengths = encoded["attention_mask"].sum(dim=1).tolist()
+        padded_length = encoded["input_ids"].shape[1]
+        encoded = encoded.to(self._model.device)
+
+        # max_length counts the prompt, so give each row the same new-token
+        # budget it would get on its own and trim the rows that ran longer.
+        budgets = [max(0, max_length - n) for n in prompt_lengths]
+        with torch.inference_mode():
+            outputs = self._model.generate(
+                **encoded,
+                max_new_tokens=max(max(budgets), 1),
+                **self._generation_kwargs(params),
+            )
+
+        texts = self._tokenizer.batch_decode(
+            [row[: padded_length + budget] for row, budget in zip(outputs, budgets)],
+            skip_special_tokens=True,
+        )
+        return [{"generated_text": text} for text in texts]
+
+    def _offloadable_modules(self) -> Dict[str, Any]:
+        if self._model is None:
+            return {}
+        return {"model": self._model}
+
     def get_vram_usage_mb(self) -> float:
         if self._model is None:
             return 0.0
@@ -1,64 +1,149 @@
+import io
+import os
 from typing import Any, Dict
 
+import numpy as np
 import torch
 
+try:
+    import soundfile as sf
+except ImportError:  # checked in load() so a missing codec fails before any request
+    sf = None
+
 from src.inference.base import BaseInferenceEngine
-from src.utils.gpu_utils import clear_gpu_cache
+from src.utils.encoding import to_bytes
+from src.utils.exceptions import InvalidParametersError
 from src.utils.logger import logger
+from src.utils.quantization import bnb_config, quantize_weights
+
+# Whisper's feature extractor only accepts 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+# Quantizations CTranslate2 (faster-whisper) checkpoints can be loaded with
+CT2_QUANT = ("none", "int8")
 
 
 class STTEngine(BaseInferenceEngine):
-    def __init__(self, model_id: str):
-        super().__init__(model_id)
+    supported_quant = ("none", "int8", "fp8", "nf4")
+
+    def __init__(self, model_id: str, quant: str = "none", default_quant: bool = False):
+        super().__init__(model_id, quant, default_quant)
         self._model = None
         self._processor = None
+        self._ct2_model = None
+        self._ct2_size_mb = 0.0
+
+    @staticmethod
+    def _is_ctranslate2(model_path: str) -> bool:
+        # CTranslate2 exports (e.g. Systran/faster-whisper-*) ship a single
+        # model.bin; transformers checkpoints never use that name
+        return os.path.isfile(os.path.join(model_path, "model.bin"))
 
     def load(self, model_path: str) -> None:
+        if self._is_ctranslate2(model_path):
+            self._load_ct2(model_path)
+        else:
+            self._load_transformers(model_path)
+        self._loaded = True
+        logger.info("STT model loaded: %s", self.model_id)
+
+    def _load_ct2(self, model_path: str) -> None:
+        from faster_whisper import WhisperModel
+
+        if self.quant not in CT2_QUANT:
+            if not self.default_quant:
+                raise InvalidParametersError(
+                    f"quant={self.quant!r} is not supported for faster-whisper models"
+                )
+            # The global setting targets the torch engines; CTranslate2
+            # exports just run unquantized under it
+            logger.warning(
+                "quant=%s is not supported for faster-whisper models, loading %s unquantized",
+                self.quant, self.model_id,
+            )
+            self.quant = "none"
+        logger.info("Loading STT model with faster-whisper: %s", self.model_id)
+        if self.device == "cuda":
+            compute_type = "int8_float16" if self.quant == "int8" else "float16"
+        else:
+            compute_type = "int8" if self.quant == "int8" else "float32"
+        self._ct2_model = WhisperModel(
+            model_path, device=self.device, compute_type=compute_type
+        )
+        # CTranslate2 allocates outside torch, so size it from the weights file
+        self._ct2_size_mb = os.path.getsize(os.path.join(model_path, "model.bin")) / (1024 ** 2)
+
+    def _load_transformers(self, model_path: str) -> None:
+        if sf is None:
+            raise ImportError("soundfile is required to decode STT audio")
         from transformers import WhisperForConditionalGeneration, WhisperProcessor
 
-        logger.info(f"Loading STT model: {self.model_id}")
+        logger.info("Loading STT model: %s", self.model_id)
         dtype = torch.float16 if self.device == "cuda" else torch.float32
         self._processor = WhisperProcessor.from_pretrained(model_path)
+        quantization_config = bnb_config(self.quant)
         self._model = WhisperForConditionalGeneration.from_pretrained(
-            model_path, torch_dtype=dtype
+            model_path,
+            torch_dtype=dtype,
+            quantization_config=quantization_config,
+            # Load weights straight onto the GPU instead of staging on CPU
+            device_map={"": self.device} if self.device == "cuda" else None,
+            low_cpu_mem_usage=True,
         )
-        if self.device == "cuda":
-            self._model = self._model.to(self.device)
-        self._loaded = True
-        logger.info(f"STT model loaded: {self.model_id}")
+        quantize_weights(self._model, self.quant)
 
     def unload(self) -> None:
         del self._model
         del self._processor
+        del self._ct2_model
         self._model = None
         self._processor = None
+        self._ct2_model = None
+        self._host_weights = {}
         self._loaded = False
-        clear_gpu_cache()
-        logger.info(f"STT model unloaded: {self.model_id}")
+        logger.info("STT model unloaded: %s", self.model_id)
 
-    def infer(self, input_data: Any, params: Dict[str, Any]) -> Any:
-        import soundfile as sf
-        import io
-        import base64
+    @staticmethod
+    def _decode_audio(audio_bytes: bytes) -> np.ndarray:
+        # float32 is what the feature extractor works in; soundfile defaults to float64
+        audio, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype="float32")
+        waveform = torch.from_numpy(audio)
+        if waveform.ndim > 1:
+            waveform = waveform.mean(dim=1)
+        if sample_rate != WHISPER_SAMPLE_RATE:
+            import torchaudio.functional as AF
+
+            waveform = AF.resample(waveform, sample_rate, WHISPER_SAMPLE_RATE)
+        return waveform.numpy()
 
+    def infer(self, input_data: Any, params: Dict[str, Any]) -> Any:
         language = params.get("language", "en")
         task = params.get("task", "transcribe")
 
-        # input_data should be base64-encoded audio
-        audio_bytes = base64.b64decode(input_data)
-        audio_data, sample_rate = sf.read(io.BytesIO(audio_bytes))
+        if self._ct2_model is not None:
+            # faster-whisper decodes and resamples the container itself
+            segments, _ = self._ct2_model.transcribe(
+                io.BytesIO(to_bytes(input_data)), language=language, task=task
+            )
+            return {"text": "".join(s.text for s in segments).strip()}
+
+        # input_data is raw bytes from the /raw route, otherwise base64 (pybase64)
+        audio_data = self._decode_audio(to_bytes(input_data))
 
-        input_features = self._processor(
+        input_features = self._processor.feature_extractor(
             audio_data,
-            sampling_rate=sample_rate,
+            sampling_rate=WHISPER_SAMPLE_RATE,
             return_tensors="pt",
-        ).input_features.to(self._model.device)
+            # Computes the log-mel spectrogram with torch on the model's device
+            device=str(self._model.device),
+        ).input_features.to(self._model.device, dtype=self._model.dtype)
+        # The decoded waveform dwarfs the features; don't hold it through generate()
+        del audio_data
 
         forced_decoder_ids = self._processor.get_decoder_prompt_ids(
             language=language, task=task
         )
 
-        with torch.no_grad():
+        with torch.inference_mode():
             predicted_ids = self._model.generate(
                 input_features, forced_decoder_ids=forced_decoder_ids
             )
@@ -68,7 +153,14 @@ class STTEngine(BaseInferenceEngine):
         )
         return {"text": transcription[0].strip()}
 
+    def _offloadable_modules(self) -> Dict[str, Any]:
+        if self._model is None:
+            return {}
+        return {"model": self._model}
+
     def get_vram_usage_mb(self) -> float:
+        if self._ct2_model is not None:
+            return self._ct2_size_mb
         if self._model is None:
             return 0.0
         return sum(
@@ -1,25 +1,25 @@
-import base64
-import io
-import tempfile
 from typing import Any, Dict
 
+import numpy as np
+
+from src.config import settings
 from src.inference.base import BaseInferenceEngine
-from src.utils.gpu_utils import clear_gpu_cache
+from src.utils.encoding import binary_result, wav_pcm16_bytes
 from src.utils.logger import logger
 
 
 class TTSEngine(BaseInferenceEngine):
-    def __init__(self, model_id: str):
-        super().__init__(model_id)
+    def __init__(self, model_id: str, quant: str = "none", default_quant: bool = False):
+        super().__init__(model_id, quant, default_quant)
         self._tts = None
         self._qwen_model = None
-
-    def _is_qwen_tts(self) -> bool:
-        model_lower = self.model_id.lower()
-        return "qwen" in model_lower and "tts" in model_lower
+        self._param_count = 0
+        model_lower = model_id.lower()
+        # The backend depends only on the model ID, so decide it once
+        self._is_qwen = "qwen" in model_lower and "tts" in model_lower
 
     def load(self, model_path: str) -> None:
-        if self._is_qwen_tts():
+        if self._is_qwen:
             self._load_qwen(model_path)
         else:
             self._load_coqui(model_path)
@@ -29,80 +29,99 @@ class TTSEngine(BaseInferenceEngine):
         import torch
         from qwen_tts import Qwen3TTSModel
 
-        logger.info(f"Loading Qwen3-TTS model: {self.model_id}")
+        logger.info("Loading Qwen3-TTS model: %s", self.model_id)
         dtype = torch.bfloat16 if self.device == "cuda" else torch.float32
         self._qwen_model = Qwen3TTSModel.from_pretrained(
             model_path,
             device_map=self.device if self.device == "cuda" else None,
             dtype=dtype,
         )
-        logger.info(f"Qwen3-TTS model loaded: {self.model_id}")
+        module = self._qwen_module()
+        if module is not None:
+            module.eval()
+            if settings.torch_compile and self.device == "cuda":
+                # The first request pays the compile; later ones replay CUDA graphs
+                module.forward = torch.compile(module.forward, mode="reduce-overhead")
+            # The wrapper itself has no parameters(); count the inner module
+            self._param_count = sum(p.numel() for p in module.parameters())
+        logger.info("Qwen3-TTS model loaded: %s", self.model_id)
 
     def _load_coqui(self, model_path: str) -> None:
         from TTS.api import TTS
 
-        logger.info(f"Loading TTS model: {self.model_id}")
+        logger.info("Loading TTS model: %s", self.model_id)
         use_gpu = self.device == "cuda"
         self._tts = TTS(model_path=model_path, gpu=use_gpu)
-        logger.info(f"TTS model loaded: {self.model_id}")
+        logger.info("TTS model loaded: %s", self.model_id)
 
     def unload(self) -> None:
         del self._tts
         self._tts = None
         del self._qwen_model
         self._qwen_model = None
+        self._param_count = 0
+        self._host_weights = {}
         self._loaded = False
-        clear_gpu_cache()
-        logger.info(f"TTS model unloaded: {self.model_id}")
+        logger.info("TTS model unloaded: %s", self.model_id)
 
     def infer(self, input_data: Any, params: Dict[str, Any]) -> Any:
         text = str(input_data)
-        if self._is_qwen_tts():
+        if self._is_qwen:
             return self._infer_qwen(text, params)
         return self._infer_coqui(text, params)
 
     def _infer_qwen(self, text: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        import soundfile as sf
+        import torch
 
         language = params.get("language", "Auto")
         speaker = params.get("speaker", "Chelsie")
 
-        wavs, sr = self._qwen_model.generate_custom_voice(
-            text=text, language=language, speaker=speaker,
-        )
+        with torch.inference_mode():
+            wavs, sr = self._qwen_model.generate_custom_voice(
+                text=text, language=language, speaker=speaker,
+            )
 
-        buf = io.BytesIO()
-        sf.write(buf, wavs[0], sr, format="WAV")
-        audio_b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-        return {"audio_base64": audio_b64, "format": "wav", "sample_rate": sr}
+        return binary_result(
+            wav_pcm16_bytes(wavs[0], sr), "audio_base64", params, format="wav", sample_rate=sr
+        )
 
     def _infer_coqui(self, text: str, params: Dict[str, Any]) -> Dict[str, Any]:
         speaker = params.get("speaker") or params.get("speaker_id")
         speed = params.get("speed", 1.0)
 
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as tmp:
-            kwargs = {"text": text, "file_path": tmp.name}
-            if speaker:
-                kwargs["speaker"] = speaker
-            if speed != 1.0:
-                kwargs["speed"] = speed
-            self._tts.tts_to_file(**kwargs)
+        kwargs = {"text": text}
+        if speaker:
+            kwargs["speaker"] = speaker
+        if speed != 1.0:
+            kwargs["speed"] = speed
+        # tts() returns the waveform, so it is encoded in memory rather
+        # than written to a temp file and read back
+        # Coqui returns a list of Python floats; pack it once as float32
+        wav = np.asarray(self._tts.tts(**kwargs), dtype=np.float32)
+        sr = self._tts.synthesizer.output_sample_rate
+        return binary_result(
+            wav_pcm16_bytes(wav, sr), "audio_base64", params, format="wav", sample_rate=sr
+        )
 
-            with open(tmp.name, "rb") as f:
-                audio_bytes = f.read()
+    def _qwen_module(self):
+        import torch
 
-        audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
-        return {"audio_base64": audio_b64, "format": "wav"}
+        # Qwen3TTSModel is a wrapper around the torch module that
+        # generate_custom_voice() drives
+        module = getattr(self._qwen_model, "model", self._qwen_model)
+        return module if isinstance(module, torch.nn.Module) else None
+
+    def _offloadable_modules(self) -> Dict[str, Any]:
+        # Coqui models are not plain torch modules; they are fully unloaded
+        module = self._qwen_module()
+        if module is not None:
+            return {"model": module}
+        return {}
 
     def get_vram_usage_mb(self) -> float:
-        if self._is_qwen_tts():
-            if self._qwen_model is None:
-                return 0.0
-            total_params = sum(
-                p.numel() for p in self._qwen_model.parameters()
-            )
-            # bfloat16 = 2 bytes per param
-            return (total_params * 2) / (1024 * 1024)
+        if self._is_qwen:
+            # bfloat16 = 2 bytes per param; counted once at load
+            return (self._param_count * 2) / (1024 * 1024)
         if self._tts is None:
             return 0.0
         return 500.0
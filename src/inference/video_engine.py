@@ -5,8 +5,8 @@ from src.utils.logger import logger
 
 
 class VideoEngine(BaseInferenceEngine):
-    def __init__(self, model_id: str):
-        super().__init__(model_id)
+    def __init__(self, model_id: str, quant: str = "none", default_quant: bool = False):
+        super().__init__(model_id, quant, default_quant)
 
     def load(self, model_path: str) -> None:
         raise NotImplementedError(
@@ -0,0 +1,74 @@
+import gc
+from typing import Any, Dict, List
+
+from src.config import settings
+from src.inference.base import BaseInferenceEngine
+from src.utils.gpu_utils import get_vram_total_gb
+from src.utils.logger import logger
+
+
+class VLLMEngine(BaseInferenceEngine):
+    supported_quant = ("none", "fp8")
+
+    def __init__(self, model_id: str, quant: str = "none", default_quant: bool = False):
+        super().__init__(model_id, quant, default_quant)
+        self._llm = None
+        self._tokenizer = None
+
+    def load(self, model_path: str) -> None:
+        from vllm import LLM
+
+        logger.info("Loading LLM with vLLM: %s from %s", self.model_id, model_path)
+        self._llm = LLM(
+            model=model_path,
+            dtype="auto",
+            # vLLM reserves this share of the GPU up front for weights + KV cache
+            gpu_memory_utilization=settings.vllm_gpu_memory_utilization,
+            quantization="fp8" if self.quant == "fp8" else None,
+            trust_remote_code=True,
+        )
+        self._tokenizer = self._llm.get_tokenizer()
+        self._loaded = True
+        logger.info("LLM loaded: %s", self.model_id)
+
+    def unload(self) -> None:
+        del self._llm
+        self._llm = None
+        self._tokenizer = None
+        self._loaded = False
+        gc.collect()
+        logger.info("LLM unloaded: %s", self.model_id)
+
+    def _sampling_params(self, prompt: str, params: Dict[str, Any]):
+        from vllm import SamplingParams
+
+        temperature = params.get("temperature", 1.0)
+        do_sample = params.get("do_sample", temperature != 1.0)
+        # max_length counts the prompt, as with transformers' generate()
+        prompt_tokens = len(self._tokenizer.encode(prompt))
+        return SamplingParams(
+            temperature=temperature if do_sample else 0.0,
+            top_p=params.get("top_p", 1.0),
+            max_tokens=max(params.get("max_length", 100) - prompt_tokens, 1),
+        )
+
+    def infer(self, input_data: Any, params: Dict[str, Any]) -> Any:
+        return self.infer_batch([input_data], [params])[0]
+
+    def infer_batch(
+        self, inputs: List[Any], params_list: List[Dict[str, Any]]
+    ) -> List[Any]:
+        # vLLM schedules the prompts together with continuous batching, and
+        # each one keeps its own sampling parameters
+        prompts = [str(i) for i in inputs]
+        sampling = [self._sampling_params(p, params) for p, params in zip(prompts, params_list)]
+        outputs = self._llm.generate(prompts, sampling, use_tqdm=False)
+        return [
+            {"generated_text": prompt + output.outputs[0].text}
+            for prompt, output in zip(prompts, outputs)
+        ]
+
+    def get_vram_usage_mb(self) -> float:
+        if self._llm is None:
+            return 0.0
+        return settings.vllm_gpu_memory_utilization * get_vram_total_gb() * 1024
@@ -13,4 +13,5 @@ class ModelState(str, Enum):
     DOWNLOADING = "downloading"
     ON_DISK = "on_disk"
     LOADED = "loaded"
+    OFFLOADED = "offloaded"
     FAILED = "failed"
@@ -10,15 +10,17 @@ if TYPE_CHECKING:
     from src.inference.base import BaseInferenceEngine
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelInfo:
     model_id: str
     task_type: TaskType
     state: ModelState = ModelState.ON_DISK
     vram_mb: float = 0.0
-    last_used: float = field(default_factory=time.time)
+    quant: str = "none"
+    # Monotonic clock, so wall-clock adjustments can't reorder the LRU
+    last_used: float = field(default_factory=time.monotonic)
     disk_path: Optional[str] = None
     engine_instance: Optional[BaseInferenceEngine] = None
 
     def touch(self):
-        self.last_used = time.time()
+        self.last_used = time.monotonic()
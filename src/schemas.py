@@ -1,10 +1,20 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from src.models.enums import TaskType
 
 
+def _examples(name: str, index: int = 0) -> Callable[[Dict[str, Any]], None]:
+    def extra(schema: Dict[str, Any]) -> None:
+        from src import docs
+
+        # BentoML's OpenAPI builder only accepts the singular OpenAPI 3.0 key
+        schema["example"] = getattr(docs, name)[index]
+
+    return extra
+
+
 class ExecuteRequest(BaseModel):
     model_id: str = Field(
         ...,
@@ -24,6 +34,7 @@ class ExecuteRequest(BaseModel):
         default_factory=dict,
         description=(
             "Task-specific parameters. "
+            "All tasks: quant (none, int8, fp8, nf4; reloads the model if it differs). "
             "Text: max_length, temperature, top_p, do_sample. "
             "Image: guidance_scale, num_inference_steps, width, height. "
             "TTS: speaker, speed. "
@@ -36,41 +47,69 @@ class ExecuteRequest(BaseModel):
         description="Force re-download from HuggingFace and reload the model into VRAM",
     )
 
-    model_config = {
-        "json_schema_extra": {
-            "examples": [
-                {
-                    "model_id": "gpt2",
-                    "input": "The future of AI is",
-                    "params": {"max_length": 100, "temperature": 0.7},
-                    "force_reload": False,
-                },
-                {
-                    "model_id": "stabilityai/stable-diffusion-2-1",
-                    "input": "A photo of an astronaut riding a horse on the moon",
-                    "params": {
-                        "guidance_scale": 7.5,
-                        "num_inference_steps": 30,
-                        "width": 512,
-                        "height": 512,
-                    },
-                    "force_reload": False,
-                },
-                {
-                    "model_id": "Qwen/Qwen3-TTS",
-                    "input": "Today is a wonderful day to build something people love.",
-                    "params": {"speaker": "Chelsie", "speed": 1.0},
-                    "force_reload": False,
-                },
-                {
-                    "model_id": "openai/whisper-small",
-                    "input": "<base64-encoded-audio-bytes>",
-                    "params": {"language": "en", "task": "transcribe"},
-                    "force_reload": False,
-                },
-            ]
-        }
-    }
+    model_config = ConfigDict(
+        json_schema_extra=_examples("EXECUTE_REQUEST"),
+        extra="ignore",
+        # input can be a multi-MB base64 blob; keep it out of validation errors
+        hide_input_in_errors=True,
+    )
+
+
+class TaskParams(BaseModel):
+    quant: Optional[str] = Field(
+        None, description="Weight quantization (none, int8, fp8, nf4); reloads the model if it differs"
+    )
+
+    # Unknown keys are passed through to the engine untouched
+    model_config = ConfigDict(extra="allow")
+
+
+class TextParams(TaskParams):
+    max_length: Optional[int] = Field(None, description="Maximum total tokens, prompt included (default 100)")
+    temperature: Optional[float] = Field(None, description="Sampling temperature (default 1.0)")
+    top_p: Optional[float] = Field(None, description="Nucleus sampling probability (default 1.0)")
+    do_sample: Optional[bool] = Field(None, description="Sample instead of greedy decoding (default: temperature != 1.0)")
+
+
+class ImageParams(TaskParams):
+    guidance_scale: Optional[float] = Field(None, description="Classifier-free guidance scale (default 7.5)")
+    num_inference_steps: Optional[int] = Field(None, description="Denoising steps (default 50)")
+    width: Optional[int] = Field(None, description="Image width in pixels (default 512)")
+    height: Optional[int] = Field(None, description="Image height in pixels (default 512)")
+    format: Optional[Literal["png", "webp", "jpeg"]] = Field(None, description="Output encoding: png, webp or jpeg (default png)")
+
+
+class TTSParams(TaskParams):
+    speaker: Optional[str] = Field(None, description="Voice to synthesize with")
+    speed: Optional[float] = Field(None, description="Speaking rate multiplier (default 1.0)")
+    language: Optional[str] = Field(None, description="Language of the text (default Auto)")
+
+
+class STTParams(TaskParams):
+    language: Optional[str] = Field(None, description="Spoken language (default en)")
+    task: Optional[str] = Field(None, description="transcribe or translate (default transcribe)")
+
+
+class ExecuteRequestText(ExecuteRequest):
+    params: TextParams = Field(default_factory=TextParams, description="Text generation parameters")
+
+
+class ExecuteRequestImage(ExecuteRequest):
+    params: ImageParams = Field(default_factory=ImageParams, description="Image generation parameters")
+
+    model_config = ConfigDict(json_schema_extra=_examples("EXECUTE_REQUEST", 1))
+
+
+class ExecuteRequestTTS(ExecuteRequest):
+    params: TTSParams = Field(default_factory=TTSParams, description="Text-to-speech parameters")
+
+    model_config = ConfigDict(json_schema_extra=_examples("EXECUTE_REQUEST", 2))
+
+
+class ExecuteRequestSTT(ExecuteRequest):
+    params: STTParams = Field(default_factory=STTParams, description="Speech-to-text parameters")
+
+    model_config = ConfigDict(json_schema_extra=_examples("EXECUTE_REQUEST", 3))
 
 
 class ExecuteResponse(BaseModel):
@@ -88,43 +127,17 @@ class ExecuteResponse(BaseModel):
         ..., description="Current GPU VRAM usage as a percentage (0-100)"
     )
 
-    model_config = {
-        "json_schema_extra": {
-            "examples": [
-                {
-                    "model_id": "gpt2",
-                    "task_type": "text",
-                    "result": {"generated_text": "The future of AI is bright and full of possibilities..."},
-                    "vram_usage_percent": 34.5,
-                },
-                {
-                    "model_id": "stabilityai/stable-diffusion-2-1",
-                    "task_type": "image",
-                    "result": {"image_base64": "<base64-encoded-png>", "format": "png"},
-                    "vram_usage_percent": 72.1,
-                },
-                {
-                    "model_id": "Qwen/Qwen3-TTS",
-                    "task_type": "audio_tts",
-                    "result": {"audio_base64": "<base64-encoded-wav>", "format": "wav", "sample_rate": 24000},
-                    "vram_usage_percent": 41.3,
-                },
-                {
-                    "model_id": "openai/whisper-small",
-                    "task_type": "audio_stt",
-                    "result": {"text": "Hello, how are you doing today?"},
-                    "vram_usage_percent": 28.7,
-                },
-            ]
-        }
-    }
+    model_config = ConfigDict(
+        json_schema_extra=_examples("EXECUTE_RESPONSE")
+    )
 
 
 class ModelStatusItem(BaseModel):
     model_id: str = Field(..., description="HuggingFace model identifier")
     task_type: Optional[str] = Field(None, description="Associated task type (text, image, audio_tts, audio_stt, video)")
-    state: str = Field(..., description="Current state: downloading, on_disk, loaded, or failed")
+    state: str = Field(..., description="Current state: downloading, on_disk, loaded, offloaded (weights in host RAM), or failed")
     vram_mb: float = Field(0.0, description="VRAM consumed by this model in megabytes (0 if not loaded)")
+    quant: Optional[str] = Field(None, description="Weight quantization the model was loaded with (none, int8, fp8, nf4)")
     last_used: Optional[float] = Field(None, description="Unix timestamp of last inference call")
 
 
@@ -133,32 +146,9 @@ class ModelStatusResponse(BaseModel):
     vram_usage_percent: float = Field(..., description="Current GPU VRAM usage as a percentage (0-100)")
     active_downloads: List[str] = Field(..., description="Model IDs currently being downloaded")
 
-    model_config = {
-        "json_schema_extra": {
-            "examples": [
-                {
-                    "models": [
-                        {
-                            "model_id": "gpt2",
-                            "task_type": "text",
-                            "state": "loaded",
-                            "vram_mb": 548.0,
-                            "last_used": 1708099200.0,
-                        },
-                        {
-                            "model_id": "stabilityai/stable-diffusion-2-1",
-                            "task_type": "image",
-                            "state": "on_disk",
-                            "vram_mb": 0.0,
-                            "last_used": None,
-                        },
-                    ],
-                    "vram_usage_percent": 34.5,
-                    "active_downloads": [],
-                }
-            ]
-        }
-    }
+    model_config = ConfigDict(
+        json_schema_extra=_examples("MODEL_STATUS_RESPONSE")
+    )
 
 
 class FetchRequest(BaseModel):
@@ -167,17 +157,15 @@ class FetchRequest(BaseModel):
         description="HuggingFace model ID to pre-download to local disk cache without loading into VRAM",
         json_schema_extra={"examples": ["gpt2"]},
     )
+    task_type: Optional[TaskType] = Field(
+        None,
+        description="If set, also load the model into VRAM for this task in the background",
+    )
 
-    model_config = {
-        "json_schema_extra": {
-            "examples": [
-                {"model_id": "gpt2"},
-                {"model_id": "stabilityai/stable-diffusion-2-1"},
-                {"model_id": "Qwen/Qwen3-TTS"},
-                {"model_id": "openai/whisper-small"},
-            ]
-        }
-    }
+    model_config = ConfigDict(
+        json_schema_extra=_examples("FETCH_REQUEST"),
+        extra="ignore",
+    )
 
 
 class FetchResponse(BaseModel):
@@ -185,39 +173,24 @@ class FetchResponse(BaseModel):
     path: str = Field(..., description="Local disk path where the model is stored")
     message: str = Field(..., description="Human-readable status message")
 
-    model_config = {
-        "json_schema_extra": {
-            "examples": [
-                {
-                    "model_id": "gpt2",
-                    "path": "/app/models/gpt2",
-                    "message": "Model gpt2 is available on disk",
-                },
-                {
-                    "model_id": "Qwen/Qwen3-TTS",
-                    "path": "/app/models/Qwen--Qwen3-TTS",
-                    "message": "Model Qwen/Qwen3-TTS is available on disk",
-                },
-            ]
-        }
-    }
+    model_config = ConfigDict(
+        json_schema_extra=_examples("FETCH_RESPONSE")
+    )
 
 
 class PurgeResponse(BaseModel):
     message: str = Field(..., description="Confirmation message")
+    freed_mb: float = Field(0.0, description="VRAM released by the purge in megabytes")
+    evicted: List[str] = Field(default_factory=list, description="Model IDs evicted from VRAM, in eviction order")
 
-    model_config = {
-        "json_schema_extra": {
-            "examples": [{"message": "All models purged from VRAM"}]
-        }
-    }
+    model_config = ConfigDict(
+        json_schema_extra=_examples("PURGE_RESPONSE")
+    )
 
 
 class ErrorResponse(BaseModel):
     detail: str = Field(..., description="Error description")
 
-    model_config = {
-        "json_schema_extra": {
-            "examples": [{"detail": "Model not found: nonexistent/model"}]
-        }
-    }
+    model_config = ConfigDict(
+        json_schema_extra=_examples("ERROR_RESPONSE")
+    )
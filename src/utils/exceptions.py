@@ -1,3 +1,8 @@
+# Messages are built in __str__, so exceptions that are raised and handled
+# internally (e.g. VRAM pressure retried after eviction) never format them.
+# The fields are passed as args so the exceptions still pickle.
+
+
 class DAMOException(Exception):
     pass
 
@@ -5,26 +10,39 @@ class DAMOException(Exception):
 class ModelNotFoundError(DAMOException):
     def __init__(self, model_id: str):
         self.model_id = model_id
-        super().__init__(f"Model not found: {model_id}")
+        super().__init__(model_id)
+
+    def __str__(self) -> str:
+        return f"Model not found: {self.model_id}"
 
 
 class VRAMExhaustedError(DAMOException):
     def __init__(self, required_gb: float, available_gb: float):
         self.required_gb = required_gb
         self.available_gb = available_gb
-        super().__init__(
-            f"Not enough VRAM: need {required_gb:.1f}GB, "
-            f"available {available_gb:.1f}GB"
+        super().__init__(required_gb, available_gb)
+
+    def __str__(self) -> str:
+        return (
+            f"Not enough VRAM: need {self.required_gb:.1f}GB, "
+            f"available {self.available_gb:.1f}GB"
         )
 
 
 class InvalidParametersError(DAMOException):
     def __init__(self, detail: str):
         self.detail = detail
-        super().__init__(f"Invalid parameters: {detail}")
+        super().__init__(detail)
+
+    def __str__(self) -> str:
+        return f"Invalid parameters: {self.detail}"
 
 
 class DownloadError(DAMOException):
     def __init__(self, model_id: str, reason: str):
         self.model_id = model_id
-        super().__init__(f"Failed to download {model_id}: {reason}")
+        self.reason = reason
+        super().__init__(model_id, reason)
+
+    def __str__(self) -> str:
+        return f"Failed to download {self.model_id}: {self.reason}"
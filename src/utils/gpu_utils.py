@@ -1,8 +1,18 @@
+from contextlib import nullcontext
+from itertools import chain
+from typing import ContextManager, Dict, Iterable, Optional
+
 import torch
 
 from src.utils.logger import logger
 
 _nvml_initialized = False
+_nvml_handle = None
+# Neither changes for the life of the process; resolved on first use
+_cuda_available: Optional[bool] = None
+_total_vram_gb: Optional[float] = None
+_prefetch_stream: Optional[torch.cuda.Stream] = None
+_model_streams: Dict[str, torch.cuda.Stream] = {}
 
 
 def _init_nvml():
@@ -15,15 +25,21 @@ def _init_nvml():
         _nvml_initialized = True
         return True
     except Exception as e:
-        logger.warning(f"pynvml init failed (no NVIDIA GPU?): {e}")
+        logger.warning("pynvml init failed (no NVIDIA GPU?): %s", e)
         return False
 
 
+def cuda_available() -> bool:
+    global _cuda_available
+    if _cuda_available is None:
+        _cuda_available = torch.cuda.is_available()
+    return _cuda_available
+
+
 def initialize_gpu() -> str:
-    if torch.cuda.is_available():
+    if cuda_available():
         device_name = torch.cuda.get_device_name(0)
-        total_memory = torch.cuda.get_device_properties(0).total_memory / (1024 ** 3)
-        logger.info(f"GPU detected: {device_name} ({total_memory:.1f} GB)")
+        logger.info("GPU detected: %s (%.1f GB)", device_name, get_vram_total_gb())
         _init_nvml()
         return "cuda"
     logger.warning("No CUDA GPU available, falling back to CPU")
@@ -31,26 +47,134 @@ def initialize_gpu() -> str:
 
 
 def get_vram_usage_gb() -> float:
-    if not torch.cuda.is_available():
+    if not cuda_available():
         return 0.0
     return torch.cuda.memory_allocated(0) / (1024 ** 3)
 
 
+def get_device_used_gb() -> float:
+    # Device-wide usage as the driver sees it: unlike memory_allocated() it
+    # includes the allocator cache, cuBLAS workspaces and non-torch libraries
+    global _nvml_handle
+    if not _nvml_initialized:
+        return get_vram_usage_gb()
+    import pynvml
+
+    if _nvml_handle is None:
+        _nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+    return pynvml.nvmlDeviceGetMemoryInfo(_nvml_handle).used / (1024 ** 3)
+
+
 def get_vram_total_gb() -> float:
-    if not torch.cuda.is_available():
-        return 0.0
-    return torch.cuda.get_device_properties(0).total_memory / (1024 ** 3)
+    global _total_vram_gb
+    if _total_vram_gb is None:
+        _total_vram_gb = (
+            torch.cuda.get_device_properties(0).total_memory / (1024 ** 3)
+            if cuda_available() else 0.0
+        )
+    return _total_vram_gb
 
 
 def get_vram_percent() -> float:
     total = get_vram_total_gb()
     if total == 0:
         return 0.0
-    return get_vram_usage_gb() / total
+    return get_device_used_gb() / total
 
 
-def clear_gpu_cache():
-    if torch.cuda.is_available():
+def cuda_dtype() -> torch.dtype:
+    # bf16 has fp32's exponent range, so it avoids fp16 overflow on Ampere+
+    if cuda_available() and torch.cuda.is_bf16_supported():
+        return torch.bfloat16
+    return torch.float16
+
+
+def clear_gpu_cache(sync: bool = False):
+    if cuda_available():
+        # Freed blocks are already stream-ordered; a device-wide sync would
+        # only stall this thread until every queued kernel has drained
+        if sync:
+            torch.cuda.synchronize()
         torch.cuda.empty_cache()
-        torch.cuda.synchronize()
         logger.info("GPU cache cleared")
+
+
+def get_prefetch_stream() -> Optional[torch.cuda.Stream]:
+    global _prefetch_stream
+    if _prefetch_stream is None and cuda_available():
+        _prefetch_stream = torch.cuda.Stream()
+    return _prefetch_stream
+
+
+def model_stream(model_id: str) -> ContextManager:
+    if not cuda_available():
+        return nullcontext()
+    stream = _model_streams.get(model_id)
+    if stream is None:
+        stream = _model_streams[model_id] = torch.cuda.Stream()
+    # Weights were loaded or restored on the caller's stream
+    stream.wait_stream(torch.cuda.current_stream())
+    return torch.cuda.stream(stream)
+
+
+def release_model_stream(model_id: str):
+    # Streams are keyed by client-supplied IDs, so drop one with its model
+    stream = _model_streams.pop(model_id, None)
+    if stream is not None:
+        # Offload/unload run on the caller's stream; order them after any
+        # kernels still queued on the model's stream
+        torch.cuda.current_stream().wait_stream(stream)
+
+
+def record_prefetch_event() -> torch.cuda.Event:
+    event = torch.cuda.Event()
+    event.record(get_prefetch_stream())
+    return event
+
+
+def wait_for_event(event: torch.cuda.Event):
+    # Orders the calling thread's stream after the event without blocking the host
+    torch.cuda.current_stream().wait_event(event)
+
+
+def cuda_module_bytes(modules: Iterable[torch.nn.Module]) -> int:
+    # parameters()/buffers() already skip tied duplicates within a module
+    return sum(
+        t.nelement() * t.element_size()
+        for module in modules
+        for t in chain(module.parameters(), module.buffers())
+        if t.device.type == "cuda"
+    )
+
+
+def host_state_dict(module: torch.nn.Module) -> Dict[str, torch.Tensor]:
+    pin = cuda_available()
+    copies: Dict[tuple, torch.Tensor] = {}
+    state = {}
+    for name, tensor in module.state_dict().items():
+        # Tied weights share storage; keep them shared on the host too
+        key = (tensor.data_ptr(), tuple(tensor.shape), tensor.dtype)
+        if key not in copies:
+            host = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=pin)
+            host.copy_(tensor)
+            copies[key] = host
+        state[name] = copies[key]
+    return state
+
+
+def swap_state_dict(
+    module: torch.nn.Module, state: Dict[str, torch.Tensor], device: str
+):
+    target = torch.device(device)
+    moved: Dict[int, torch.Tensor] = {}
+    weights = {}
+    for name, tensor in state.items():
+        if id(tensor) not in moved:
+            moved[id(tensor)] = tensor.to(target, non_blocking=True)
+        weights[name] = moved[id(tensor)]
+    module.load_state_dict(weights, assign=True)
+    # Non-persistent buffers are not part of the state dict
+    for submodule in module.modules():
+        for name, buffer in submodule._buffers.items():
+            if buffer is not None and buffer.device.type != target.type:
+                submodule._buffers[name] = buffer.to(target)
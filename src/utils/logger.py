@@ -3,6 +3,13 @@ import sys
 
 from src.config import settings
 
+# None of the formats used in this process print thread, process or source
+# location fields, so skip collecting them for every record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+logging._srcfile = None
+
 
 def setup_logger(name: str = "damo") -> logging.Logger:
     logger = logging.getLogger(name)
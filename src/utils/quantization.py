@@ -0,0 +1,49 @@
+from typing import Any, Optional
+
+import torch
+
+from src.utils.exceptions import InvalidParametersError
+
+QUANT_MODES = ("none", "int8", "fp8", "nf4")
+
+
+def validate_quant(quant: str, supported: tuple) -> str:
+    if quant not in QUANT_MODES:
+        raise InvalidParametersError(
+            f"quant must be one of {', '.join(QUANT_MODES)}, got {quant!r}"
+        )
+    if quant not in supported:
+        raise InvalidParametersError(
+            f"quant={quant!r} is not supported for this task "
+            f"(supported: {', '.join(supported)})"
+        )
+    return quant
+
+
+def bnb_config(quant: str) -> Optional[Any]:
+    if quant not in ("int8", "nf4"):
+        return None
+    from transformers import BitsAndBytesConfig
+
+    if quant == "int8":
+        return BitsAndBytesConfig(load_in_8bit=True)
+    return BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_compute_dtype=torch.bfloat16,
+        # Quantizes the per-block scales too, saving ~0.4 bits per parameter
+        bnb_4bit_use_double_quant=True,
+    )
+
+
+def quantize_weights(module: torch.nn.Module, quant: str) -> None:
+    if quant not in ("int8", "fp8"):
+        return
+    from torchao.quantization import (
+        Float8WeightOnlyConfig,
+        Int8WeightOnlyConfig,
+        quantize_,
+    )
+
+    config = Float8WeightOnlyConfig() if quant == "fp8" else Int8WeightOnlyConfig()
+    quantize_(module, config)
@@ -4,9 +4,10 @@ import pytest
 from fastapi.testclient import TestClient
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client():
-    # Patch model_manager before importing app
+    # Patch model_manager before importing app; one app and client serve
+    # every test here, since the mocked manager keeps no per-test state
     mock_mm = MagicMock()
     mock_mm.vram_manager.get_vram_usage_percent.return_value = 25.0
     mock_mm.get_all_model_status.return_value = []
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.core.batcher import RequestBatcher
+from src.models.enums import TaskType
+
+
+def _echo_batch(model_id, task_type, inputs, params_list, force_reload):
+    return [{"echo": i} for i in inputs]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_batched():
+    infer_batch = MagicMock(side_effect=_echo_batch)
+    batcher = RequestBatcher(infer_batch, max_batch_size=8, max_latency_ms=50)
+
+    results = await asyncio.gather(*[
+        batcher.submit("gpt2", TaskType.TEXT, f"prompt-{i}", {}) for i in range(4)
+    ])
+
+    assert [r["echo"] for r in results] == [f"prompt-{i}" for i in range(4)]
+    infer_batch.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_batch_respects_max_batch_size():
+    infer_batch = MagicMock(side_effect=_echo_batch)
+    batcher = RequestBatcher(infer_batch, max_batch_size=2, max_latency_ms=50)
+
+    await asyncio.gather(*[
+        batcher.submit("gpt2", TaskType.TEXT, i, {}) for i in range(5)
+    ])
+
+    assert infer_batch.call_count == 3
+    assert all(len(call.args[2]) <= 2 for call in infer_batch.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_different_models_are_not_mixed():
+    infer_batch = MagicMock(side_effect=_echo_batch)
+    batcher = RequestBatcher(infer_batch, max_batch_size=8, max_latency_ms=20)
+
+    await asyncio.gather(
+        batcher.submit("gpt2", TaskType.TEXT, "a", {}),
+        batcher.submit("other/model", TaskType.TEXT, "b", {}),
+    )
+
+    model_ids = sorted(call.args[0] for call in infer_batch.call_args_list)
+    assert model_ids == ["gpt2", "other/model"]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_per_request():
+    def infer_batch(model_id, task_type, inputs, params_list, force_reload):
+        if "bad" in inputs:
+            raise ValueError("bad input")
+        return [{"echo": i} for i in inputs]
+
+    batcher = RequestBatcher(infer_batch, max_batch_size=8, max_latency_ms=50)
+    good, bad = await asyncio.gather(
+        batcher.submit("gpt2", TaskType.TEXT, "good", {}),
+        batcher.submit("gpt2", TaskType.TEXT, "bad", {}),
+        return_exceptions=True,
+    )
+
+    assert good == {"echo": "good"}
+    assert isinstance(bad, ValueError)
+
+
+@pytest.mark.asyncio
+async def test_force_reload_happens_once_per_batch():
+    reloads = []
+
+    def infer_batch(model_id, task_type, inputs, params_list, force_reload):
+        reloads.append(force_reload)
+        if "bad" in inputs:
+            raise ValueError("bad input")
+        return [{"echo": i} for i in inputs]
+
+    batcher = RequestBatcher(infer_batch, max_batch_size=8, max_latency_ms=50)
+    await asyncio.gather(
+        batcher.submit("gpt2", TaskType.TEXT, "good", {}, force_reload=True),
+        batcher.submit("gpt2", TaskType.TEXT, "bad", {}, force_reload=True),
+        return_exceptions=True,
+    )
+
+    # The failed batch reloaded; the per-request retries reuse those weights
+    assert reloads == [True, False, False]
+
+
+@pytest.mark.asyncio
+async def test_same_model_batches_do_not_overlap():
+    running = []
+    overlaps = []
+    guard = threading.Lock()
+
+    def infer_batch(model_id, task_type, inputs, params_list, force_reload):
+        with guard:
+            running.append(model_id)
+            overlaps.append(running.count(model_id) > 1)
+        time.sleep(0.02)
+        with guard:
+            running.remove(model_id)
+        return [{"echo": i} for i in inputs]
+
+    batcher = RequestBatcher(infer_batch, max_batch_size=8, max_latency_ms=0)
+    await asyncio.gather(
+        batcher.submit("shared", TaskType.TEXT, "a", {}),
+        batcher.submit("shared", TaskType.IMAGE, "b", {}),
+        batcher.submit("other", TaskType.TEXT, "c", {}),
+    )
+
+    assert not any(overlaps)
+
+
+@pytest.mark.asyncio
+async def test_idle_worker_and_lock_are_released():
+    infer_batch = MagicMock(side_effect=_echo_batch)
+    batcher = RequestBatcher(infer_batch, max_latency_ms=1, idle_timeout_s=0.05)
+
+    await batcher.submit("gpt2", TaskType.TEXT, "a", {})
+    assert batcher._model_locks == {}
+    worker = batcher._workers[(TaskType.TEXT, "gpt2")]
+    await asyncio.wait_for(worker, 1)
+    assert batcher._queues == {} and batcher._workers == {}
+
+    # A later request starts a fresh worker
+    assert (await batcher.submit("gpt2", TaskType.TEXT, "b", {}))["echo"] == "b"
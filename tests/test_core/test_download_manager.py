@@ -1,4 +1,5 @@
 import asyncio
+import threading
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -50,3 +51,117 @@ def test_list_cached_models(download_manager):
 def test_model_disk_path_format(download_manager):
     path = download_manager._model_disk_path("org/model-name")
     assert "org--model-name" in str(path)
+
+
+def test_download_reuses_resolved_path(download_manager):
+    path = download_manager._model_disk_path("org/model")
+    path.mkdir(parents=True)
+    (path / "config.json").write_text("{}")
+
+    assert download_manager.download("org/model") == str(path)
+    with patch.object(download_manager, "is_cached") as mock_cached:
+        assert download_manager.download("org/model") == str(path)
+        mock_cached.assert_not_called()
+
+        download_manager.invalidate("org/model")
+        download_manager.download("org/model")
+        mock_cached.assert_called_once()
+
+
+def test_active_downloads_snapshot(download_manager):
+    seen = []
+
+    def fake_download(model_id):
+        seen.append(download_manager.active_downloads)
+        return str(download_manager._model_disk_path(model_id))
+
+    with patch.object(download_manager, "_download_sync", side_effect=fake_download):
+        download_manager.download("org/model")
+
+    assert seen == [("org/model",)]
+    assert download_manager.active_downloads == ()
+
+
+def test_cache_index_is_built_at_startup(tmp_path):
+    path = tmp_path / "org--model"
+    path.mkdir()
+    (path / "config.json").write_text("{}")
+    (tmp_path / "org--empty").mkdir()
+
+    with patch("src.core.download_manager.settings") as mock_settings:
+        mock_settings.model_cache_dir = str(tmp_path)
+        manager = DownloadManager()
+
+    # Indexed models only need an isdir check, not a directory listing
+    with patch.object(manager, "_is_complete") as mock_is_complete:
+        assert manager.get_disk_path("org/model") == str(path)
+        mock_is_complete.assert_not_called()
+    assert manager.is_cached("org/empty") is False
+
+
+def test_duplicate_download_waits_for_the_first(download_manager):
+    started = threading.Event()
+    finish = threading.Event()
+    path = download_manager._model_disk_path("org/model")
+
+    def slow_download(model_id):
+        started.set()
+        finish.wait(2)
+        path.mkdir(parents=True)
+        (path / "config.json").write_text("{}")
+        return str(path)
+
+    results = []
+    with patch.object(download_manager, "_download_sync", side_effect=slow_download) as mock_sync:
+        first = threading.Thread(target=lambda: results.append(download_manager.download("org/model")))
+        first.start()
+        assert started.wait(2)
+        second = threading.Thread(target=lambda: results.append(download_manager.download("org/model")))
+        second.start()
+        finish.set()
+        first.join()
+        second.join()
+
+    assert mock_sync.call_count == 1
+    assert results == [str(path), str(path)]
+
+
+def test_readahead_advises_weight_files_only(download_manager, tmp_path):
+    (tmp_path / "unet").mkdir()
+    (tmp_path / "unet" / "model.safetensors").write_bytes(b"w")
+    (tmp_path / "config.json").write_text("{}")
+    with patch("src.core.download_manager.os.posix_fadvise", create=True) as mock_fadvise:
+        download_manager.readahead(str(tmp_path))
+    assert mock_fadvise.call_count == 1
+
+
+def test_download_refetches_deleted_model(download_manager):
+    path = download_manager._model_disk_path("org/model")
+    path.mkdir(parents=True)
+    (path / "config.json").write_text("{}")
+    assert download_manager.download("org/model") == str(path)
+
+    (path / "config.json").unlink()
+    path.rmdir()
+    assert download_manager.get_disk_path("org/model") is None
+
+    with patch.object(download_manager, "_download_sync", return_value=str(path)) as mock_sync:
+        assert download_manager.download("org/model") == str(path)
+    mock_sync.assert_called_once_with("org/model")
+
+
+def test_interrupted_download_is_not_cached(tmp_path):
+    path = tmp_path / "org--model"
+    path.mkdir()
+    (path / "config.json").write_text("{}")
+    (path / "model.safetensors.incomplete").write_bytes(b"")
+    (path / "model.safetensors.incomplete.partial").write_text("[0]")
+
+    with patch("src.core.download_manager.settings") as mock_settings:
+        mock_settings.model_cache_dir = str(tmp_path)
+        manager = DownloadManager()
+
+    assert manager.is_cached("org/model") is False
+    with patch.object(manager, "_download_sync", return_value=str(path)) as mock_sync:
+        manager.download("org/model")
+    mock_sync.assert_called_once_with("org/model")
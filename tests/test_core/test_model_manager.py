@@ -0,0 +1,173 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.core.model_manager import ModelManager
+from src.models.enums import ModelState, TaskType
+
+
+@pytest.fixture
+def model_manager():
+    with patch("src.core.model_manager.VRAMManager"), \
+            patch("src.core.model_manager.DownloadManager"):
+        manager = ModelManager()
+    manager.vram_manager.can_load_model.return_value = True
+    return manager
+
+
+def _engine_cls():
+    engine_cls = MagicMock()
+    engine_cls.supported_quant = ("none",)
+    engine_cls.return_value.get_vram_usage_mb.return_value = 100.0
+    engine_cls.return_value.resident_vram_mb.return_value = 0.0
+    return engine_cls
+
+
+def test_loaded_model_is_not_blocked_by_another_load(model_manager):
+    model_manager.download_manager.download.side_effect = lambda m: f"/models/{m}"
+    engine_cls = _engine_cls()
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load(path):
+        if path == "/models/big":
+            loading.set()
+            release.wait(5)
+
+    engine_cls.return_value.load.side_effect = slow_load
+
+    with patch("src.core.model_manager.get_engine_class", return_value=engine_cls):
+        model_manager.load_model("small", TaskType.TEXT)
+        big = threading.Thread(target=model_manager.load_model, args=("big", TaskType.TEXT))
+        big.start()
+        assert loading.wait(2)
+
+        done = threading.Event()
+        threading.Thread(
+            target=lambda: (model_manager.load_model("small", TaskType.TEXT), done.set())
+        ).start()
+        # The already-loaded model is served while "big" is still loading
+        assert done.wait(1)
+        release.set()
+        big.join()
+
+
+def test_same_model_loads_once(model_manager):
+    model_manager.download_manager.download.return_value = "/models/gpt2"
+    engine_cls = _engine_cls()
+
+    with patch("src.core.model_manager.get_engine_class", return_value=engine_cls):
+        threads = [
+            threading.Thread(target=model_manager.load_model, args=("gpt2", TaskType.TEXT))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    engine_cls.return_value.load.assert_called_once_with("/models/gpt2")
+    assert model_manager._model_registry["gpt2"].state == ModelState.LOADED
+
+
+def test_vram_is_measured_from_engine_tensors(model_manager):
+    model_manager.download_manager.download.return_value = "/models/a"
+    engine_cls = _engine_cls()
+    engine_cls.return_value.resident_vram_mb.return_value = 2560.0
+    with patch("src.core.model_manager.get_engine_class", return_value=engine_cls):
+        info = model_manager.load_model("a", TaskType.TEXT)
+    assert info.vram_mb == 2560.0
+    engine_cls.return_value.get_vram_usage_mb.assert_not_called()
+
+
+def test_vram_falls_back_to_engine_estimate_without_cuda(model_manager):
+    model_manager.download_manager.download.return_value = "/models/a"
+    engine_cls = _engine_cls()
+    with patch("src.core.model_manager.get_engine_class", return_value=engine_cls):
+        info = model_manager.load_model("a", TaskType.TEXT)
+    assert info.vram_mb == 100.0
+
+
+def test_force_reload_reuses_resident_engine(model_manager):
+    model_manager.download_manager.download.return_value = "/models/gpt2"
+    engine_cls = _engine_cls()
+
+    with patch("src.core.model_manager.get_engine_class", return_value=engine_cls):
+        first = model_manager.load_model("gpt2", TaskType.TEXT)
+        engine = first.engine_instance
+        second = model_manager.load_model("gpt2", TaskType.TEXT, force_reload=True)
+
+    assert second.engine_instance is engine
+    engine_cls.assert_called_once()
+    engine.reload.assert_called_once_with("/models/gpt2")
+    engine.unload.assert_not_called()
+    model_manager.vram_manager.unregister_model.assert_called_once_with("gpt2", unload=False)
+
+
+def test_purge_unloads_offloaded_models(model_manager):
+    model_manager.download_manager.download.return_value = "/models/gpt2"
+    engine_cls = _engine_cls()
+    model_manager.vram_manager.purge_all.return_value = []
+
+    with patch("src.core.model_manager.get_engine_class", return_value=engine_cls):
+        info = model_manager.load_model("gpt2", TaskType.TEXT)
+    info.state = ModelState.OFFLOADED
+
+    model_manager.purge_all()
+    info.engine_instance.unload.assert_called_once()
+    assert info.state == ModelState.ON_DISK
+
+
+def test_model_stays_locked_during_inference(model_manager):
+    model_manager.download_manager.download.return_value = "/models/gpt2"
+    engine_cls = _engine_cls()
+    locked = []
+    engine_cls.return_value.infer.side_effect = (
+        lambda i, p: locked.append(model_manager._model_locks["gpt2"].locked())
+    )
+
+    with patch("src.core.model_manager.get_engine_class", return_value=engine_cls):
+        model_manager.infer("gpt2", TaskType.TEXT, "hi", {})
+    assert locked == [True]
+    assert model_manager._model_locks == {}
+
+
+def test_failed_load_leaves_no_model_lock(model_manager):
+    model_manager.download_manager.download.side_effect = RuntimeError("not found")
+
+    with patch("src.core.model_manager.get_engine_class", return_value=_engine_cls()):
+        with pytest.raises(RuntimeError):
+            model_manager.load_model("no/such-model", TaskType.TEXT)
+    assert model_manager._model_locks == {}
+    assert model_manager._lock_users == {}
+
+
+def test_prefetch_skips_busy_model(model_manager):
+    info = MagicMock(state=ModelState.OFFLOADED, vram_mb=100.0)
+    model_manager._model_registry["gpt2"] = info
+
+    with patch("src.core.model_manager.get_prefetch_stream", return_value=MagicMock()), \
+            patch("src.core.model_manager.record_prefetch_event"):
+        with model_manager._hold("gpt2"):
+            assert model_manager.prefetch("gpt2") is False
+        info.engine_instance.restore.assert_not_called()
+
+        assert model_manager.prefetch("gpt2") is True
+    info.engine_instance.restore.assert_called_once()
+    assert model_manager._model_locks == {}
+
+
+def test_engine_knows_whether_quant_was_requested(model_manager):
+    model_manager.download_manager.download.return_value = "/models/whisper"
+    engine_cls = _engine_cls()
+    engine_cls.supported_quant = ("none", "nf4")
+
+    with patch("src.core.model_manager.get_engine_class", return_value=engine_cls), \
+            patch("src.core.model_manager.settings") as mock_settings:
+        mock_settings.quantization = "nf4"
+        mock_settings.offload_to_host = False
+        model_manager.load_model("whisper", TaskType.AUDIO_STT)
+        engine_cls.assert_called_with("whisper", "nf4", True)
+        model_manager.load_model("whisper", TaskType.AUDIO_STT, force_reload=True, quant="none")
+        engine_cls.assert_called_with("whisper", "none", False)
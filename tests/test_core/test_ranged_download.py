@@ -0,0 +1,95 @@
+import hashlib
+import json
+
+import httpx
+import pytest
+
+from src.core import ranged_download
+from src.core.ranged_download import download_file, redundant_weight_files
+
+
+def _range_server(payload: bytes, requests: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        range_header = request.headers.get("range")
+        requests.append(range_header)
+        if range_header is None:
+            return httpx.Response(200, content=payload)
+        lo, hi = (int(x) for x in range_header.removeprefix("bytes=").split("-"))
+        return httpx.Response(206, content=payload[lo:hi + 1])
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(ranged_download, "CHUNKED_MIN_BYTES", 16)
+    monkeypatch.setattr(ranged_download, "CONNECTIONS_PER_FILE", 4)
+
+
+def test_large_file_is_fetched_in_ranges(tmp_path, small_chunks):
+    payload = bytes(range(256)) * 4
+    requests = []
+    dest = tmp_path / "model.safetensors"
+
+    download_file(
+        _range_server(payload, requests), "https://hf.test/model.safetensors",
+        dest, len(payload), hashlib.sha256(payload).hexdigest(),
+    )
+
+    assert dest.read_bytes() == payload
+    assert sorted(requests) == ["bytes=0-255", "bytes=256-511", "bytes=512-767", "bytes=768-1023"]
+    assert not (tmp_path / "model.safetensors.incomplete.partial").exists()
+
+
+def test_interrupted_download_resumes_missing_chunks(tmp_path, small_chunks):
+    payload = bytes(range(256)) * 4
+    dest = tmp_path / "model.safetensors"
+    incomplete = tmp_path / "model.safetensors.incomplete"
+    incomplete.write_bytes(payload[:512] + bytes(512))
+    (tmp_path / "model.safetensors.incomplete.partial").write_text(json.dumps([0, 1]))
+    requests = []
+
+    download_file(_range_server(payload, requests), "https://hf.test/m", dest, len(payload))
+
+    assert dest.read_bytes() == payload
+    assert sorted(requests) == ["bytes=512-767", "bytes=768-1023"]
+
+
+def test_checksum_mismatch_is_rejected(tmp_path):
+    dest = tmp_path / "config.json"
+    with pytest.raises(ValueError):
+        download_file(_range_server(b"{}", []), "https://hf.test/c", dest, 2, "0" * 64)
+    assert not dest.exists()
+
+
+def test_redundant_weight_files_only_where_safetensors_exist():
+    files = [
+        "config.json",
+        "model.safetensors",
+        "pytorch_model.bin",
+        "unet/diffusion_pytorch_model.safetensors",
+        "unet/diffusion_pytorch_model.bin",
+        "text_encoder/pytorch_model.bin",
+    ]
+    assert redundant_weight_files(files) == [
+        "pytorch_model.bin",
+        "unet/diffusion_pytorch_model.bin",
+    ]
+
+
+def test_redundant_weight_files_keeps_bin_without_matching_safetensors():
+    files = [
+        "unet/diffusion_pytorch_model.fp16.safetensors",
+        "unet/diffusion_pytorch_model.bin",
+        "vae/diffusion_pytorch_model.fp16.safetensors",
+        "vae/diffusion_pytorch_model.fp16.bin",
+        "model.safetensors.index.json",
+        "model-00001-of-00002.safetensors",
+        "pytorch_model-00001-of-00002.bin",
+        "adapter_model.bin",
+    ]
+    # The default-variant unet has no safetensors, so its .bin is kept
+    assert redundant_weight_files(files) == [
+        "vae/diffusion_pytorch_model.fp16.bin",
+        "pytorch_model-00001-of-00002.bin",
+    ]
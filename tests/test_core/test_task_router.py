@@ -0,0 +1,20 @@
+from unittest.mock import patch
+
+from src.core.task_router import get_engine_class
+from src.inference.llm_engine import LLMEngine
+from src.inference.stt_engine import STTEngine
+from src.inference.vllm_engine import VLLMEngine
+from src.models.enums import TaskType
+
+
+def test_text_uses_transformers_by_default():
+    with patch("src.core.task_router.settings") as settings:
+        settings.llm_backend = "transformers"
+        assert get_engine_class(TaskType.TEXT) is LLMEngine
+
+
+def test_vllm_backend_only_applies_to_text():
+    with patch("src.core.task_router.settings") as settings:
+        settings.llm_backend = "vllm"
+        assert get_engine_class(TaskType.TEXT) is VLLMEngine
+        assert get_engine_class(TaskType.AUDIO_STT) is STTEngine
@@ -1,4 +1,6 @@
+import threading
 import time
+from contextlib import contextmanager
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -8,11 +10,25 @@ from src.models.enums import ModelState, TaskType
 from src.models.model_info import ModelInfo
 
 
+def _hold_with(locks):
+    @contextmanager
+    def hold(model_id, blocking=True, timeout=-1):
+        lock = locks.get(model_id) or threading.Lock()
+        acquired = lock.acquire(blocking, timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+    return hold
+
+
 @pytest.fixture
 def vram_manager():
     with patch("src.core.vram_manager.settings") as mock_settings:
         mock_settings.vram_threshold = 0.9
         mock_settings.max_vram_gb = 8.0
+        mock_settings.eviction_lookahead = 8
         manager = VRAMManager()
     return manager
 
@@ -20,6 +36,7 @@ def vram_manager():
 def _make_model_info(model_id: str, vram_mb: float = 500, last_used: float = None):
     engine = MagicMock()
     engine.unload = MagicMock()
+    engine.can_offload = False
     info = ModelInfo(
         model_id=model_id,
         task_type=TaskType.TEXT,
@@ -74,7 +91,7 @@ def test_evict_lru_order(mock_cache, mock_total, mock_usage, vram_manager):
     call_count = 0
     original = vram_manager.can_load_model
 
-    def side_effect(gb):
+    def side_effect(gb, current_gb=None):
         nonlocal call_count
         call_count += 1
         if call_count > 1:
@@ -88,6 +105,123 @@ def test_evict_lru_order(mock_cache, mock_total, mock_usage, vram_manager):
     assert "new_model" in vram_manager.loaded_models
 
 
+@patch("src.core.vram_manager.clear_gpu_cache")
+def test_evict_offloads_when_host_copy_exists(mock_cache, vram_manager):
+    info = _make_model_info("gpt2")
+    info.engine_instance.can_offload = True
+    vram_manager.register_model(info)
+    vram_manager.evict("gpt2")
+    assert "gpt2" not in vram_manager.loaded_models
+    assert info.state == ModelState.OFFLOADED
+    info.engine_instance.offload.assert_called_once()
+    info.engine_instance.unload.assert_not_called()
+
+
+@patch("src.core.vram_manager.clear_gpu_cache")
+def test_evict_unloads_without_host_copy(mock_cache, vram_manager):
+    info = _make_model_info("gpt2")
+    vram_manager.register_model(info)
+    vram_manager.evict("gpt2")
+    assert info.state == ModelState.ON_DISK
+    info.engine_instance.unload.assert_called_once()
+
+
+def test_choose_victim_prefers_models_not_queued(vram_manager):
+    old = _make_model_info("old_model", last_used=100.0)
+    new = _make_model_info("new_model", last_used=999.0)
+    vram_manager.register_model(old)
+    vram_manager.register_model(new)
+
+    assert vram_manager.choose_victim() is old
+    vram_manager.mark_pending("old_model")
+    assert vram_manager.choose_victim() is new
+    vram_manager.mark_done("old_model")
+    assert vram_manager.choose_victim() is old
+
+
+def test_choose_victim_ranks_queued_models_by_position(vram_manager):
+    for model_id in ("a", "b", "c", "d"):
+        vram_manager.register_model(_make_model_info(model_id))
+    vram_manager.mark_pending("c")
+    vram_manager.mark_pending("a")
+    vram_manager.mark_pending("d")
+    vram_manager.mark_pending("b")
+
+    # Every model is queued: the one whose request comes last goes first
+    assert vram_manager.choose_victim().model_id == "b"
+    vram_manager.mark_done("b")
+    # b is no longer queued, so it is evicted ahead of every queued model
+    assert vram_manager.choose_victim().model_id == "b"
+    assert vram_manager.choose_victim(skip={"b"}).model_id == "d"
+
+    # A hinted-only model ranks after the whole queue window
+    vram_manager.hint("b")
+    assert vram_manager.choose_victim().model_id == "b"
+    vram_manager.mark_pending("b")
+    assert vram_manager.choose_victim().model_id == "b"
+    assert vram_manager.choose_victim(skip={"b"}).model_id == "d"
+
+
+@patch("src.core.vram_manager.clear_gpu_cache")
+def test_reclaim_skips_models_in_use(mock_cache, vram_manager):
+    busy = threading.Lock()
+    locks = {"a": busy}
+    vram_manager._hold_model = _hold_with(locks)
+    for model_id in ("a", "b", "c"):
+        vram_manager.register_model(_make_model_info(model_id))
+    vram_manager.mark_pending("c")
+
+    # "a" is running (its lock is held); queued "c" is evicted, but last
+    with busy:
+        evicted = vram_manager.reclaim()
+    assert evicted == ["b", "c"]
+    assert list(vram_manager.loaded_models) == ["a"]
+
+
+@patch("src.core.vram_manager.get_vram_total_gb", return_value=10.0 / 0.9)
+@patch("src.core.vram_manager.get_vram_usage_gb", return_value=8.0)
+@patch("src.core.vram_manager.clear_gpu_cache")
+def test_load_waits_for_running_model_instead_of_failing(mock_cache, mock_usage, mock_total, vram_manager):
+    running = threading.Lock()
+    vram_manager._hold_model = _hold_with({"a": running})
+    vram_manager.register_model(_make_model_info("a", vram_mb=8192))
+    vram_manager.mark_pending("a")
+
+    running.acquire()
+    threading.Timer(0.1, running.release).start()
+    # 8GB of a 10GB limit is in use by "a", which is mid-request
+    vram_manager.reclaim(4.0)
+    assert "a" not in vram_manager.loaded_models
+    assert not running.locked()
+
+
+@patch("src.core.vram_manager.release_model_stream")
+@patch("src.core.vram_manager.clear_gpu_cache")
+def test_purge_frees_host_copy(mock_cache, mock_release, vram_manager):
+    info = _make_model_info("gpt2")
+    info.engine_instance.can_offload = True
+    vram_manager.register_model(info)
+    assert vram_manager.purge_all() == ["gpt2"]
+    mock_release.assert_called_once_with("gpt2")
+    assert info.state == ModelState.ON_DISK
+    info.engine_instance.unload.assert_called_once()
+    info.engine_instance.offload.assert_not_called()
+
+
+def test_hints_expire_and_are_cleared_on_eviction(vram_manager):
+    for model_id in ("a", "b"):
+        vram_manager.register_model(_make_model_info(model_id))
+    vram_manager.hint("a")
+    assert vram_manager.choose_victim().model_id == "b"
+
+    with patch("src.core.vram_manager.time.monotonic", return_value=time.monotonic() + 301):
+        assert vram_manager.choose_victim().model_id == "a"
+
+    with patch("src.core.vram_manager.clear_gpu_cache"):
+        vram_manager.evict("a")
+    assert "a" not in vram_manager._hints
+
+
 def test_purge_all(vram_manager):
     with patch("src.core.vram_manager.clear_gpu_cache"):
         info1 = _make_model_info("m1")
@@ -96,3 +230,45 @@ def test_purge_all(vram_manager):
         vram_manager.register_model(info2)
         vram_manager.purge_all()
         assert len(vram_manager.loaded_models) == 0
+
+
+@patch("src.core.vram_manager.get_device_used_gb", return_value=2.0)
+@patch("src.core.vram_manager.get_vram_total_gb", return_value=8.0)
+def test_vram_usage_percent_is_cached(mock_total, mock_usage, vram_manager):
+    assert vram_manager.get_vram_usage_percent() == 25.0
+    mock_usage.return_value = 4.0
+    assert vram_manager.get_vram_usage_percent() == 25.0
+    assert mock_usage.call_count == 1
+
+    # Loading a model invalidates the cached reading
+    vram_manager.register_model(_make_model_info("gpt2"))
+    assert vram_manager.get_vram_usage_percent() == 50.0
+
+
+@patch("src.core.vram_manager.get_vram_total_gb", return_value=8.0)
+@patch("src.core.vram_manager.clear_gpu_cache")
+def test_reclaim_stops_once_target_is_free(mock_cache, mock_total, vram_manager):
+    for model_id, last_used in [("a", 100.0), ("b", 200.0), ("c", 300.0)]:
+        vram_manager.register_model(
+            _make_model_info(model_id, vram_mb=2048, last_used=last_used)
+        )
+
+    # Limit = 7.2; each eviction frees 2GB from 7.0 used, tracked without re-polling
+    with patch("src.core.vram_manager.get_vram_usage_gb", return_value=7.0) as mock_usage:
+        evicted = vram_manager.reclaim(3.0)
+    mock_usage.assert_called_once()
+
+    assert evicted == ["a", "b"]
+    assert list(vram_manager.loaded_models) == ["c"]
+    # One cache release for the whole batch of evictions
+    mock_cache.assert_called_once()
+
+
+def test_access_moves_model_to_back_of_eviction_order(vram_manager):
+    for model_id in ("a", "b", "c"):
+        vram_manager.register_model(_make_model_info(model_id))
+    assert vram_manager.choose_victim().model_id == "a"
+
+    vram_manager.update_access_time("a")
+    assert vram_manager.choose_victim().model_id == "b"
+    assert list(vram_manager.loaded_models) == ["b", "c", "a"]
@@ -0,0 +1,40 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from src.utils.encoding import wav_pcm16_bytes
+
+
+def _soundfile_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, samples, sample_rate, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("shape", [(4000,), (4000, 2)])
+def test_wav_matches_soundfile(shape):
+    samples = np.random.default_rng(0).uniform(-1.0, 1.0, shape).astype(np.float32)
+    ours = wav_pcm16_bytes(samples, 24000)
+    expected = _soundfile_wav(samples, 24000)
+
+    assert ours[:44] == expected[:44]
+    assert ours == expected
+
+    decoded, sample_rate = sf.read(io.BytesIO(ours), dtype="int16")
+    assert sample_rate == 24000
+    assert decoded.shape == shape
+
+
+def test_wav_clips_out_of_range_samples():
+    samples = np.array([2.0, 1.0, -1.0, -3.5, np.inf, -np.inf], dtype=np.float32)
+    ours = wav_pcm16_bytes(samples, 16000)
+    pcm = np.frombuffer(ours[44:], dtype="<i2")
+    assert pcm.tolist() == [32767, 32767, -32768, -32768, 32767, -32768]
+    assert ours == _soundfile_wav(samples, 16000)
+
+
+def test_wav_rejects_nan():
+    with pytest.raises(ValueError):
+        wav_pcm16_bytes(np.array([0.0, np.nan], dtype=np.float32), 16000)